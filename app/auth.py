@@ -1,37 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import ALGORITHM, SECRET_KEY
+from app.cache import MISSING, TTLCache
+from app.config import (
+    ALGORITHM,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    SECRET_KEY,
+    USER_CACHE_MAXSIZE,
+    USER_CACHE_TTL,
+)
 from app.db_depends import get_async_db
 from app.models.users import User as UserModel
 
 # Создаём контекст для хеширования с использованием bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt отпускает GIL, поэтому хеширование выполняется в пуле потоков,
+# не блокируя event loop воркера
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_tasks_in_flight = 0
+
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# Кеш активных пользователей по email (sub из JWT), запись помечена тегом по id.
+# Хранятся только поля, нужные обработчикам; хеш пароля не кешируется.
+user_cache = TTLCache("users", maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+USER_CACHE_FIELDS = ("id", "email", "is_active", "role")
+
+
+async def _run_password_task(func, *args):
+    """
+    Выполняет операцию bcrypt в пуле потоков.
+    Если пул уже занят PASSWORD_HASH_MAX_PENDING задачами, сразу отвечает 503,
+    не ставя запрос в очередь.
+    """
+    global _password_tasks_in_flight
+    if _password_tasks_in_flight >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _password_tasks_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_tasks_in_flight -= 1
+
 
-def hash_password(password: str) -> str:
+async def hash_password(password: str) -> str:
     """
     Преобразует пароль в хеш с использованием bcrypt.
     """
-    return pwd_context.hash(password)
+    return await _run_password_task(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Проверяет, соответствует ли введённый пароль сохранённому хешу.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await _run_password_task(pwd_context.verify, plain_password, hashed_password)
 
 
 def create_access_token(data: dict):
@@ -64,6 +107,53 @@ def create_refresh_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+async def get_active_user(db: AsyncSession, email: str) -> UserModel | None:
+    """
+    Возвращает активного пользователя по email, используя кеш воркера.
+    При попадании в кеш возвращается несвязанный с сессией экземпляр UserModel.
+    """
+    cached = user_cache.get(email)
+    if cached is not MISSING:
+        return UserModel(**cached)
+    version = user_cache.version
+
+    result = await db.scalars(
+        select(UserModel).where(UserModel.email == email, UserModel.is_active)
+    )
+    user = result.first()
+    if user is not None:
+        user_cache.set(
+            email,
+            {field: getattr(user, field) for field in USER_CACHE_FIELDS},
+            tags=[("user", user.id)],
+            version=version,
+        )
+    return user
+
+
+def invalidate_user(email: str | None = None, user_id: int | None = None) -> None:
+    """
+    Удаляет пользователя из кеша (при деактивации или смене роли).
+    """
+    if email is not None:
+        user_cache.delete(email)
+    if user_id is not None:
+        user_cache.invalidate_tag(("user", user_id))
+
+
+@event.listens_for(UserModel, "after_update")
+def _invalidate_updated_user(mapper, connection, target: UserModel) -> None:
+    """
+    Сбрасывает кеш, когда через ORM меняются активность, роль или email.
+    """
+    state = inspect(target)
+    if any(
+        state.attrs[field].history.has_changes()
+        for field in ("is_active", "role", "email")
+    ):
+        invalidate_user(user_id=target.id)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
@@ -88,10 +178,7 @@ async def get_current_user(
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email, UserModel.is_active)
-    )
-    user = result.first()
+    user = await get_active_user(db, email)
     if user is None:
         raise credentials_exception
     return user
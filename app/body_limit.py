@@ -0,0 +1,61 @@
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import MAX_MULTIPART_BODY_SIZE
+
+BODY_TOO_LARGE = "Request body is too large"
+
+
+class MultipartBodyLimitMiddleware:
+    """
+    ASGI-middleware, ограничивающее размер multipart-запросов до разбора
+    формы. Starlette сохраняет файлы формы во временные файлы целиком ещё
+    до вызова обработчика, поэтому проверять размер нужно здесь:
+    запрос с большим Content-Length отклоняется сразу, а тело без него
+    обрывается, как только прочитано больше MAX_MULTIPART_BODY_SIZE байт.
+    Потоковые загрузки других типов (импорт товаров) не ограничиваются.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_MULTIPART_BODY_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        content_type = headers.get(b"content-type", b"").split(b";")[0].strip()
+        if content_type.lower() != b"multipart/form-data":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length")
+        if (
+            content_length is not None
+            and content_length.isdigit()
+            and int(content_length) > self.max_size
+        ):
+            response = JSONResponse(
+                {"detail": BODY_TOO_LARGE},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    # Исключение из разбора формы FastAPI превращает в ответ 413
+                    raise HTTPException(
+                        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, BODY_TOO_LARGE
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
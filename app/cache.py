@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.config import (
+    CATALOG_CACHE_MAXSIZE,
+    CATALOG_CACHE_TTL,
+    SUGGEST_CACHE_MAXSIZE,
+    SUGGEST_CACHE_TTL,
+)
+from app.metrics import CACHE_EVICTIONS, CACHE_LOOKUPS
+from app.replicas import replica_router
+
+# Маркер отсутствия значения (None тоже может быть закешировано)
+MISSING = object()
+
+# Все кеши воркера по имени — для отдачи статистики
+caches: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кеш с временем жизни записей.
+    Живёт в памяти одного воркера, поэтому TTL ограничивает рассинхронизацию
+    между процессами gunicorn.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Увеличивается при каждой инвалидации; см. set(..., version=...)
+        self.version = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._tags: dict[Hashable, set[Hashable]] = {}
+        self._key_tags: dict[Hashable, tuple[Hashable, ...]] = {}
+        self._hit_metric = CACHE_LOOKUPS.labels(name, "hit")
+        self._miss_metric = CACHE_LOOKUPS.labels(name, "miss")
+        self._eviction_metric = CACHE_EVICTIONS.labels(name)
+        caches[name] = self
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            self._miss_metric.inc()
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            self._miss_metric.inc()
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        self._hit_metric.inc()
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[Hashable] = (),
+        version: int | None = None,
+    ) -> None:
+        """
+        Сохраняет значение. Если передан version и с момента его получения
+        была инвалидация, значение могло устареть и не сохраняется.
+        """
+        if version is not None and version != self.version:
+            return
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        tags = tuple(tags)
+        if tags:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+            self._eviction_metric.inc()
+
+    def delete(self, *keys: Hashable) -> None:
+        self.version += 1
+        for key in keys:
+            self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """
+        Удаляет все записи, сохранённые с указанным тегом.
+        """
+        self.version += 1
+        for key in self._tags.pop(tag, ()):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._data.clear()
+        self._tags.clear()
+        self._key_tags.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def cache_stats() -> dict[str, dict[str, int | float]]:
+    """
+    Возвращает счётчики всех кешей текущего воркера.
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+# --------------- Кеш ответов каталога -------------------------
+
+# Сериализованные JSON-ответы GET-эндпоинтов каталога
+catalog_cache = TTLCache(
+    "catalog", maxsize=CATALOG_CACHE_MAXSIZE, ttl=CATALOG_CACHE_TTL
+)
+
+# Сериализованные ответы подсказок по коротким префиксам названий
+suggest_cache = TTLCache(
+    "product_suggest", maxsize=SUGGEST_CACHE_MAXSIZE, ttl=SUGGEST_CACHE_TTL
+)
+
+
+def invalidate_product_cache(product_id: int, *category_ids: int) -> None:
+    """
+    Удаляет карточку товара и все закешированные списки его категорий.
+    """
+    replica_router.read_from_primary()
+    catalog_cache.delete(("product", product_id))
+    for category_id in category_ids:
+        catalog_cache.invalidate_tag(("category_listing", category_id))
+
+
+def cached_response(key: Hashable) -> Response | None:
+    """
+    Возвращает закешированный JSON-ответ каталога или None.
+    """
+    body = catalog_cache.get(key)
+    if body is MISSING:
+        return None
+    return Response(content=body, media_type="application/json")
+
+
+def cache_response(
+    key: Hashable,
+    adapter: TypeAdapter,
+    data: Any,
+    version: int,
+    tags: Iterable[Hashable] = (),
+) -> Response:
+    """
+    Сериализует ответ по схеме, сохраняет его в кеше каталога и возвращает.
+    """
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    catalog_cache.set(key, body, tags=tags, version=version)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,559 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import (
+    CART_FLUSH_BATCH_SIZE,
+    CART_FLUSH_INTERVAL,
+    CART_KV_TTL,
+    CART_REDIS_URL,
+    CART_STORAGE,
+)
+from app.database import async_session_maker
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.products import Product as ProductModel
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_UNAVAILABLE = "Product not found or inactive"
+ITEM_NOT_FOUND = "Cart item not found"
+
+
+@dataclass
+class CartLine:
+    """
+    Позиция корзины. В key-value хранилище у позиции нет своего id,
+    и идентификатором служит ID товара.
+    """
+
+    id: int
+    quantity: int
+    product: ProductModel
+
+
+async def _ensure_product_available(db: AsyncSession, product_id: int) -> ProductModel:
+    product = await db.scalar(
+        select(ProductModel).where(
+            ProductModel.id == product_id,
+            ProductModel.is_active,
+        )
+    )
+    if product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=PRODUCT_UNAVAILABLE
+        )
+    return product
+
+
+async def _write_carts(db: AsyncSession, carts: dict[int, dict[int, int]]) -> None:
+    """
+    Приводит cart_items указанных пользователей к переданному состоянию:
+    один upsert изменённых позиций и один DELETE лишних.
+    """
+    rows = [
+        {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+        for user_id, items in carts.items()
+        for product_id, quantity in items.items()
+    ]
+    if rows:
+        upsert = insert(CartItemModel).values(rows)
+        await db.execute(
+            upsert.on_conflict_do_update(
+                constraint="uq_cart_items_user_product",
+                set_={"quantity": upsert.excluded.quantity, "updated_at": func.now()},
+                where=CartItemModel.quantity != upsert.excluded.quantity,
+            )
+        )
+    keep = [(row["user_id"], row["product_id"]) for row in rows]
+    await db.execute(
+        delete(CartItemModel).where(
+            CartItemModel.user_id.in_(carts),
+            tuple_(CartItemModel.user_id, CartItemModel.product_id).not_in(keep),
+        )
+    )
+
+
+class CartStorage(ABC):
+    """
+    Хранилище корзин, которым пользуются эндпоинты /cart.
+    Методы получают сессию запроса и сами отвечают 404, как раньше отвечали
+    обработчики. Позиции возвращаются объектами с полями id, quantity, product.
+    """
+
+    @abstractmethod
+    async def get_items(self, db: AsyncSession, user_id: int) -> list[Any]: ...
+
+    @abstractmethod
+    async def add_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any: ...
+
+    @abstractmethod
+    async def update_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any: ...
+
+    @abstractmethod
+    async def remove_item(
+        self, db: AsyncSession, user_id: int, product_id: int
+    ) -> None: ...
+
+    @abstractmethod
+    async def replace(
+        self, db: AsyncSession, user_id: int, quantities: dict[int, int]
+    ) -> list[Any]:
+        """
+        Заменяет корзину целиком. Доступность товаров проверяет вызывающий.
+        """
+
+    @abstractmethod
+    async def clear(self, db: AsyncSession, user_id: int) -> None: ...
+
+    async def prepare_checkout(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Записывает корзину в cart_items в транзакции оформления заказа,
+        чтобы заказ собирался из согласованного снимка.
+        """
+
+    async def after_checkout(self, user_id: int, ordered: dict[int, int]) -> None:
+        """
+        Вызывается после коммита заказа, когда cart_items уже очищены.
+        ordered — заказанные позиции: product_id -> quantity.
+        """
+
+
+class SqlCartStorage(CartStorage):
+    """
+    Корзины в таблице cart_items; каждое изменение — один SQL-запрос.
+    """
+
+    async def get_items(self, db: AsyncSession, user_id: int) -> list[Any]:
+        result = await db.scalars(
+            select(CartItemModel)
+            .options(selectinload(CartItemModel.product))
+            .where(CartItemModel.user_id == user_id)
+            .order_by(CartItemModel.id)
+        )
+        return list(result.all())
+
+    async def add_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any:
+        # Проверка товара, upsert и чтение результата — один запрос: вставка
+        # идёт из SELECT по активному товару, поэтому для недоступного строк нет
+        upsert = insert(CartItemModel).from_select(
+            ["user_id", "product_id", "quantity"],
+            select(literal(user_id), ProductModel.id, literal(quantity)).where(
+                ProductModel.id == product_id, ProductModel.is_active
+            ),
+        )
+        upserted = (
+            upsert.on_conflict_do_update(
+                constraint="uq_cart_items_user_product",
+                set_={
+                    "quantity": CartItemModel.quantity + upsert.excluded.quantity,
+                    "updated_at": func.now(),
+                },
+            )
+            .returning(
+                CartItemModel.id, CartItemModel.product_id, CartItemModel.quantity
+            )
+            .cte("upserted")
+        )
+        result = await db.execute(
+            select(upserted.c.id, upserted.c.quantity, ProductModel).join(
+                ProductModel, ProductModel.id == upserted.c.product_id
+            )
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=PRODUCT_UNAVAILABLE
+            )
+        await db.commit()
+        return CartLine(row.id, row.quantity, row.Product)
+
+    async def update_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any:
+        result = await db.execute(
+            update(CartItemModel)
+            .where(
+                CartItemModel.user_id == user_id,
+                CartItemModel.product_id == product_id,
+                ProductModel.id == CartItemModel.product_id,
+                ProductModel.is_active,
+            )
+            .values(quantity=quantity, updated_at=func.now())
+            .returning(CartItemModel.id, CartItemModel.quantity, ProductModel),
+            execution_options={"synchronize_session": False},
+        )
+        row = result.first()
+        if row is None:
+            # Ничего не обновлено — выясняем причину, чтобы ответить как раньше
+            await _ensure_product_available(db, product_id)
+            raise HTTPException(status_code=404, detail=ITEM_NOT_FOUND)
+        await db.commit()
+        return CartLine(row.id, row.quantity, row.Product)
+
+    async def remove_item(
+        self, db: AsyncSession, user_id: int, product_id: int
+    ) -> None:
+        removed = await db.scalar(
+            delete(CartItemModel)
+            .where(
+                CartItemModel.user_id == user_id,
+                CartItemModel.product_id == product_id,
+            )
+            .returning(CartItemModel.id)
+        )
+        if removed is None:
+            raise HTTPException(status_code=404, detail=ITEM_NOT_FOUND)
+        await db.commit()
+
+    async def replace(
+        self, db: AsyncSession, user_id: int, quantities: dict[int, int]
+    ) -> list[Any]:
+        await _write_carts(db, {user_id: quantities})
+        items = await self.get_items(db, user_id)
+        await db.commit()
+        return items
+
+    async def clear(self, db: AsyncSession, user_id: int) -> None:
+        await db.execute(delete(CartItemModel).where(CartItemModel.user_id == user_id))
+        await db.commit()
+
+
+# --------------- Key-value хранилище с отложенной записью -------------------------
+
+
+class CartStore(ABC):
+    """
+    Key-value хранилище корзин: для каждого пользователя — отображение
+    product_id -> quantity и отметка «изменена, но не записана в cart_items».
+    load возвращает None, если корзина в хранилище ещё не загружалась.
+    """
+
+    @abstractmethod
+    async def load(self, user_id: int) -> dict[int, int] | None: ...
+
+    @abstractmethod
+    async def replace(self, user_id: int, items: dict[int, int]) -> None: ...
+
+    @abstractmethod
+    async def increment(self, user_id: int, product_id: int, quantity: int) -> int: ...
+
+    @abstractmethod
+    async def set_existing(self, user_id: int, product_id: int, quantity: int) -> bool:
+        """
+        Задаёт количество, только если товар уже есть в корзине.
+        """
+
+    @abstractmethod
+    async def remove(self, user_id: int, product_id: int) -> bool: ...
+
+    @abstractmethod
+    async def remove_unchanged(self, user_id: int, items: dict[int, int]) -> None:
+        """
+        Удаляет позиции items, количество которых в корзине не изменилось.
+        """
+
+    @abstractmethod
+    async def mark_dirty(self, user_id: int) -> None: ...
+
+    @abstractmethod
+    async def pop_dirty(self, limit: int) -> list[int]: ...
+
+
+class InMemoryCartStore(CartStore):
+    """
+    Хранилище в памяти процесса. Корзина видна только этому воркеру,
+    поэтому оно подходит для тестов и запуска в один процесс.
+    """
+
+    def __init__(self):
+        self._carts: dict[int, dict[int, int]] = {}
+        self._dirty: dict[int, None] = {}
+
+    async def load(self, user_id: int) -> dict[int, int] | None:
+        items = self._carts.get(user_id)
+        return None if items is None else dict(items)
+
+    async def replace(self, user_id: int, items: dict[int, int]) -> None:
+        self._carts[user_id] = dict(items)
+
+    async def increment(self, user_id: int, product_id: int, quantity: int) -> int:
+        items = self._carts.setdefault(user_id, {})
+        items[product_id] = items.get(product_id, 0) + quantity
+        return items[product_id]
+
+    async def set_existing(self, user_id: int, product_id: int, quantity: int) -> bool:
+        items = self._carts.get(user_id, {})
+        if product_id not in items:
+            return False
+        items[product_id] = quantity
+        return True
+
+    async def remove(self, user_id: int, product_id: int) -> bool:
+        return self._carts.get(user_id, {}).pop(product_id, None) is not None
+
+    async def remove_unchanged(self, user_id: int, items: dict[int, int]) -> None:
+        cart = self._carts.get(user_id, {})
+        for product_id, quantity in items.items():
+            if cart.get(product_id) == quantity:
+                del cart[product_id]
+
+    async def mark_dirty(self, user_id: int) -> None:
+        self._dirty[user_id] = None
+
+    async def pop_dirty(self, limit: int) -> list[int]:
+        user_ids = list(itertools.islice(self._dirty, limit))
+        for user_id in user_ids:
+            del self._dirty[user_id]
+        return user_ids
+
+
+class RedisCartStore(CartStore):
+    """
+    Корзины в Redis: хеш cart:<user_id> (поле "_" отмечает загруженную
+    корзину) и множество cart:dirty. Требует пакет redis.
+    """
+
+    LOADED = "_"
+    DIRTY_KEY = "cart:dirty"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"cart:{user_id}"
+
+    async def load(self, user_id: int) -> dict[int, int] | None:
+        fields = await self._redis.hgetall(self._key(user_id))
+        if not fields:
+            return None
+        fields.pop(self.LOADED, None)
+        return {
+            int(product_id): int(quantity) for product_id, quantity in fields.items()
+        }
+
+    async def replace(self, user_id: int, items: dict[int, int]) -> None:
+        key = self._key(user_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={self.LOADED: 0, **items})
+            pipe.expire(key, CART_KV_TTL)
+            await pipe.execute()
+
+    async def increment(self, user_id: int, product_id: int, quantity: int) -> int:
+        key = self._key(user_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, product_id, quantity)
+            pipe.expire(key, CART_KV_TTL)
+            result, _ = await pipe.execute()
+        return result
+
+    async def set_existing(self, user_id: int, product_id: int, quantity: int) -> bool:
+        key = self._key(user_id)
+        if not await self._redis.hexists(key, product_id):
+            return False
+        await self._redis.hset(key, product_id, quantity)
+        return True
+
+    async def remove(self, user_id: int, product_id: int) -> bool:
+        return bool(await self._redis.hdel(self._key(user_id), product_id))
+
+    async def remove_unchanged(self, user_id: int, items: dict[int, int]) -> None:
+        from redis.exceptions import WatchError
+
+        key = self._key(user_id)
+        product_ids = list(items)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # WATCH: если корзину изменят между чтением и удалением,
+            # транзакция не выполнится и сравнение повторится
+            while True:
+                try:
+                    await pipe.watch(key)
+                    current = await pipe.hmget(key, product_ids)
+                    unchanged = [
+                        product_id
+                        for product_id, quantity in zip(product_ids, current)
+                        if quantity is not None and int(quantity) == items[product_id]
+                    ]
+                    pipe.multi()
+                    if unchanged:
+                        pipe.hdel(key, *unchanged)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    async def mark_dirty(self, user_id: int) -> None:
+        await self._redis.sadd(self.DIRTY_KEY, user_id)
+
+    async def pop_dirty(self, limit: int) -> list[int]:
+        return [
+            int(user_id) for user_id in await self._redis.spop(self.DIRTY_KEY, limit)
+        ]
+
+
+class KeyValueCartStorage(CartStorage):
+    """
+    Корзины в key-value хранилище с отложенной записью в cart_items:
+    изменённые корзины пачками переносятся в базу фоновой задачей раз
+    в CART_FLUSH_INTERVAL секунд. Если корзины нет в хранилище, она
+    загружается из cart_items.
+    """
+
+    def __init__(self, store: CartStore):
+        self.store = store
+        self._flush_task: asyncio.Task | None = None
+
+    async def _load(self, db: AsyncSession, user_id: int) -> dict[int, int]:
+        items = await self.store.load(user_id)
+        if items is None:
+            result = await db.execute(
+                select(CartItemModel.product_id, CartItemModel.quantity)
+                .where(CartItemModel.user_id == user_id)
+                .order_by(CartItemModel.id)
+            )
+            items = dict(result.tuples().all())
+            await self.store.replace(user_id, items)
+        return items
+
+    async def _lines(self, db: AsyncSession, items: dict[int, int]) -> list[CartLine]:
+        if not items:
+            return []
+        products = {
+            product.id: product
+            for product in await db.scalars(
+                select(ProductModel).where(ProductModel.id.in_(items))
+            )
+        }
+        return [
+            CartLine(product_id, quantity, products[product_id])
+            for product_id, quantity in items.items()
+            if product_id in products
+        ]
+
+    async def _changed(self, user_id: int) -> None:
+        await self.store.mark_dirty(user_id)
+        if self._flush_task is None or self._flush_task.done():
+            # Пустой контекст: запись в фоне не относится к запросу,
+            # который её запустил (см. app/query_stats.py)
+            self._flush_task = asyncio.create_task(
+                self._flush_loop(), context=contextvars.Context()
+            )
+
+    async def get_items(self, db: AsyncSession, user_id: int) -> list[Any]:
+        return await self._lines(db, await self._load(db, user_id))
+
+    async def add_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any:
+        product = await _ensure_product_available(db, product_id)
+        await self._load(db, user_id)
+        quantity = await self.store.increment(user_id, product_id, quantity)
+        await self._changed(user_id)
+        return CartLine(product_id, quantity, product)
+
+    async def update_item(
+        self, db: AsyncSession, user_id: int, product_id: int, quantity: int
+    ) -> Any:
+        product = await _ensure_product_available(db, product_id)
+        await self._load(db, user_id)
+        if not await self.store.set_existing(user_id, product_id, quantity):
+            raise HTTPException(status_code=404, detail=ITEM_NOT_FOUND)
+        await self._changed(user_id)
+        return CartLine(product_id, quantity, product)
+
+    async def remove_item(
+        self, db: AsyncSession, user_id: int, product_id: int
+    ) -> None:
+        await self._load(db, user_id)
+        if not await self.store.remove(user_id, product_id):
+            raise HTTPException(status_code=404, detail=ITEM_NOT_FOUND)
+        await self._changed(user_id)
+
+    async def replace(
+        self, db: AsyncSession, user_id: int, quantities: dict[int, int]
+    ) -> list[Any]:
+        await self.store.replace(user_id, quantities)
+        await self._changed(user_id)
+        return await self._lines(db, quantities)
+
+    async def clear(self, db: AsyncSession, user_id: int) -> None:
+        await self.replace(db, user_id, {})
+
+    async def prepare_checkout(self, db: AsyncSession, user_id: int) -> None:
+        await _write_carts(db, {user_id: await self._load(db, user_id)})
+
+    async def after_checkout(self, user_id: int, ordered: dict[int, int]) -> None:
+        # Убираем только заказанные позиции и только с тем же количеством:
+        # изменения корзины после снимка (например, с другого устройства)
+        # остаются. Отметка перезапишет cart_items, уже очищенные заказом,
+        # по текущему состоянию корзины
+        if ordered:
+            await self.store.remove_unchanged(user_id, ordered)
+        await self._changed(user_id)
+
+    async def flush(self) -> int:
+        """
+        Записывает изменённые корзины в cart_items пачками по
+        CART_FLUSH_BATCH_SIZE пользователей. Возвращает число корзин.
+        """
+        flushed = 0
+        while user_ids := await self.store.pop_dirty(CART_FLUSH_BATCH_SIZE):
+            carts = {}
+            for user_id in user_ids:
+                items = await self.store.load(user_id)
+                if items is not None:
+                    carts[user_id] = items
+            try:
+                async with async_session_maker() as session:
+                    await _write_carts(session, carts)
+                    await session.commit()
+            except Exception:
+                # Не потерять изменения: корзины будут записаны в следующий раз
+                for user_id in user_ids:
+                    await self.store.mark_dirty(user_id)
+                raise
+            flushed += len(carts)
+        return flushed
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(CART_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush carts to the database")
+
+
+def create_cart_storage() -> CartStorage:
+    """
+    Создаёт хранилище корзин по настройке CART_STORAGE: sql, memory или redis.
+    """
+    if CART_STORAGE == "sql":
+        return SqlCartStorage()
+    if CART_STORAGE == "memory":
+        return KeyValueCartStorage(InMemoryCartStore())
+    if CART_STORAGE == "redis":
+        return KeyValueCartStorage(RedisCartStore(CART_REDIS_URL))
+    raise ValueError(f"Unknown CART_STORAGE: {CART_STORAGE}")
+
+
+cart_storage = create_cart_storage()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import CATEGORY_TREE_TTL
+from app.models.categories import Category as CategoryModel
+
+
+@dataclass(frozen=True)
+class CategoryTreeSnapshot:
+    """
+    Неизменяемый снимок дерева активных категорий.
+    Категории, до которых нельзя дойти от активного корня, в дерево не входят.
+    """
+
+    version: int
+    loaded_at: float
+    names: dict[int, str]
+    parents: dict[int, int | None]
+    children: dict[int | None, tuple[int, ...]]
+    subtrees: dict[int, tuple[int, ...]] = field(default_factory=dict)
+
+    def descendants(self, category_id: int) -> tuple[int, ...]:
+        """
+        Возвращает ID категории и всех её потомков.
+        """
+        return self.subtrees.get(category_id, (category_id,))
+
+    def ancestors(self, category_id: int) -> list[int]:
+        """
+        Возвращает ID категории и всех её предков, начиная с неё самой.
+        """
+        result = []
+        current = category_id
+        while current is not None and current in self.parents:
+            result.append(current)
+            current = self.parents[current]
+        return result
+
+    def as_tree(self, parent_id: int | None = None) -> list[dict]:
+        """
+        Возвращает вложенное представление дерева для ответа API.
+        """
+        return [
+            {
+                "id": category_id,
+                "name": self.names[category_id],
+                "parent_id": parent_id,
+                "children": self.as_tree(category_id),
+            }
+            for category_id in self.children.get(parent_id, ())
+        ]
+
+
+def build_snapshot(
+    version: int, rows: list[tuple[int, str, int | None]]
+) -> CategoryTreeSnapshot:
+    """
+    Строит снимок дерева из строк (id, name, parent_id) активных категорий.
+    """
+    names = {category_id: name for category_id, name, _ in rows}
+    all_children: dict[int | None, list[int]] = {}
+    for category_id, _, parent_id in sorted(rows):
+        all_children.setdefault(parent_id, []).append(category_id)
+
+    # Обходим дерево от корней: категории с неактивным родителем недостижимы
+    parents: dict[int, int | None] = {}
+    children: dict[int | None, tuple[int, ...]] = {}
+    order: list[int] = []
+    stack: list[int | None] = [None]
+    while stack:
+        parent_id = stack.pop()
+        kids = tuple(all_children.get(parent_id, ()))
+        if kids:
+            children[parent_id] = kids
+        for category_id in kids:
+            parents[category_id] = parent_id
+            order.append(category_id)
+            stack.append(category_id)
+
+    # Поддеревья собираем снизу вверх: потомки идут в order после предков
+    subtrees: dict[int, list[int]] = {}
+    for category_id in reversed(order):
+        subtree = [category_id]
+        for child_id in children.get(category_id, ()):
+            subtree.extend(subtrees[child_id])
+        subtrees[category_id] = subtree
+
+    return CategoryTreeSnapshot(
+        version=version,
+        loaded_at=time.monotonic(),
+        names={category_id: names[category_id] for category_id in parents},
+        parents=parents,
+        children=children,
+        subtrees={key: tuple(value) for key, value in subtrees.items()},
+    )
+
+
+# Текущий снимок дерева в памяти воркера
+_snapshot: CategoryTreeSnapshot | None = None
+_lock = asyncio.Lock()
+
+
+async def rebuild_category_tree(db: AsyncSession) -> CategoryTreeSnapshot:
+    """
+    Загружает активные категории одним запросом и публикует новый снимок.
+    """
+    global _snapshot
+    result = await db.execute(
+        select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id).where(
+            CategoryModel.is_active
+        )
+    )
+    version = _snapshot.version + 1 if _snapshot is not None else 1
+    _snapshot = build_snapshot(version, [tuple(row) for row in result.all()])
+    return _snapshot
+
+
+async def get_category_tree(db: AsyncSession) -> CategoryTreeSnapshot:
+    """
+    Возвращает снимок дерева категорий, загружая его при первом обращении.
+    Изменения из других воркеров подхватываются по истечении CATEGORY_TREE_TTL.
+    """
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and time.monotonic() - snapshot.loaded_at < CATEGORY_TREE_TTL
+    ):
+        return snapshot
+    async with _lock:
+        if _snapshot is not snapshot:
+            return _snapshot
+        return await rebuild_category_tree(db)
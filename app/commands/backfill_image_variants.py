@@ -0,0 +1,102 @@
+"""
+Заполнение products.image_variant_files для уже загруженных изображений
+активных товаров.
+
+Запуск:
+    python -m app.commands.backfill_image_variants [--batch-size 500] [--regenerate]
+
+Если производные изображения уже лежат на диске, в товар записываются
+имена найденных файлов; иначе они создаются заново в пуле процессов.
+С --regenerate производные создаются заново для всех изображений.
+Команду можно прерывать и запускать повторно: обработанные товары
+пропускаются.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, select
+
+from app.config import IMAGE_WORKERS
+from app.database import async_session_maker
+from app.images import (
+    MEDIA_URL,
+    generate_image_variants,
+    store_image_variants,
+    variant_paths,
+)
+from app.models.products import Product as ProductModel
+
+
+async def _variant_files(
+    executor: ProcessPoolExecutor, image_url: str, regenerate: bool
+) -> list[str]:
+    file_name = image_url.removeprefix(MEDIA_URL)
+    if not regenerate:
+        existing = [path.name for path in variant_paths(file_name) if path.exists()]
+        if existing:
+            return existing
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, generate_image_variants, file_name)
+
+
+async def backfill(batch_size: int, regenerate: bool) -> int:
+    """
+    Записывает производные изображений товаров и возвращает число
+    обработанных изображений.
+    """
+    processed = 0
+    last_url = ""
+    executor = ProcessPoolExecutor(
+        max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        while True:
+            # Одно изображение может быть у нескольких товаров — берём
+            # уникальные URL по порядку, чтобы продолжать с места остановки
+            filters = [
+                ProductModel.is_active,
+                ProductModel.image_url.startswith(MEDIA_URL),
+                ProductModel.image_url > last_url,
+            ]
+            if not regenerate:
+                filters.append(func.cardinality(ProductModel.image_variant_files) == 0)
+            async with async_session_maker() as db:
+                result = await db.scalars(
+                    select(ProductModel.image_url)
+                    .where(*filters)
+                    .group_by(ProductModel.image_url)
+                    .order_by(ProductModel.image_url)
+                    .limit(batch_size)
+                )
+                image_urls = result.all()
+            if not image_urls:
+                break
+
+            variant_files = await asyncio.gather(
+                *(_variant_files(executor, url, regenerate) for url in image_urls)
+            )
+            for image_url, files in zip(image_urls, variant_files):
+                if files:
+                    await store_image_variants(image_url, files)
+            processed += len(image_urls)
+            last_url = image_urls[-1]
+            print(f"images processed: {processed}")
+    finally:
+        executor.shutdown()
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--regenerate", action="store_true")
+    args = parser.parse_args()
+    processed = asyncio.run(backfill(args.batch_size, args.regenerate))
+    print(f"Backfilled image variants for {processed} images")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Пересчёт products.review_count и products.grade_sum по активным отзывам.
+Миграция заполняет агрегаты сама; команда нужна, только если они
+разошлись с отзывами (например, после ручной правки данных).
+
+Запуск:
+    python -m app.commands.backfill_product_ratings [--batch-size 5000]
+
+Товары обрабатываются пачками по диапазонам id. Строки пачки блокируются
+до подсчёта агрегатов, поэтому отзывы, созданные во время работы команды,
+не теряются и не учитываются дважды.
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import func, select, update
+
+from app.database import async_session_maker
+from app.models.products import Product as ProductModel
+from app.models.reviews import Review as ReviewModel
+
+
+async def backfill(batch_size: int) -> int:
+    """
+    Пересчитывает агрегаты отзывов для всех товаров и возвращает их число.
+    """
+    # Коррелированные подзапросы по активным отзывам товара
+    active_reviews = (
+        ReviewModel.product_id == ProductModel.id,
+        ReviewModel.is_active,
+    )
+    processed = 0
+    async with async_session_maker() as db:
+        max_id = await db.scalar(select(func.max(ProductModel.id))) or 0
+        for start in range(1, max_id + 1, batch_size):
+            end = start + batch_size - 1
+            in_batch = ProductModel.id.between(start, end)
+            locked = await db.scalars(
+                select(ProductModel.id).where(in_batch).with_for_update()
+            )
+            processed += len(locked.all())
+
+            await db.execute(
+                update(ProductModel)
+                .where(in_batch)
+                .values(
+                    review_count=select(func.count(ReviewModel.id))
+                    .where(*active_reviews)
+                    .scalar_subquery(),
+                    grade_sum=select(func.coalesce(func.sum(ReviewModel.grade), 0))
+                    .where(*active_reviews)
+                    .scalar_subquery(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            print(f"products {start}-{end}: done")
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    processed = asyncio.run(backfill(args.batch_size))
+    print(f"Backfilled review aggregates for {processed} products")
+
+
+if __name__ == "__main__":
+    main()
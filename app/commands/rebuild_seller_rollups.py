@@ -0,0 +1,37 @@
+"""
+Пересчёт дневных агрегатов продаж продавцов (seller_daily_sales)
+из истории заказов.
+
+Запуск:
+    python -m app.commands.rebuild_seller_rollups [--since 2026-01-01]
+
+Без --since таблица пересобирается целиком, иначе — начиная с указанного дня.
+Пересчёт идёт в одной транзакции, и на это время оформление заказов
+ожидает его завершения.
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+from app.database import async_session_maker
+from app.seller_rollups import rebuild_rollups
+
+
+async def rebuild(since: date | None) -> int:
+    async with async_session_maker() as db:
+        rows = await rebuild_rollups(db, since)
+        await db.commit()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--since", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    rows = asyncio.run(rebuild(args.since))
+    print(f"Rebuilt seller sales rollups: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
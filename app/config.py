@@ -1,4 +1,5 @@
 import os
+from decimal import Decimal
 
 from dotenv import load_dotenv
 
@@ -6,3 +7,113 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Подсчёт total для списка товаров: ниже порога — точный COUNT,
+# выше — оценка планировщика; результат кешируется на TTL секунд
+PRODUCT_COUNT_EXACT_THRESHOLD = int(os.getenv("PRODUCT_COUNT_EXACT_THRESHOLD", "10000"))
+PRODUCT_COUNT_CACHE_TTL = float(os.getenv("PRODUCT_COUNT_CACHE_TTL", "30"))
+# Границы ценовых диапазонов в фасетах списка товаров (через запятую, по возрастанию);
+# фасеты кешируются так же, как total
+PRODUCT_PRICE_FACET_BOUNDS = [
+    Decimal(bound.strip())
+    for bound in os.getenv(
+        "PRODUCT_PRICE_FACET_BOUNDS", "500,1000,2500,5000,10000,25000"
+    ).split(",")
+    if bound.strip()
+]
+
+# Кеш выдачи поиска по релевантности: ранжированные id первых
+# SEARCH_CACHE_MAX_RESULTS товаров для каждого набора фильтров;
+# сбрасывается вместе с total при изменении товаров
+SEARCH_CACHE_MAXSIZE = int(os.getenv("SEARCH_CACHE_MAXSIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_RESULTS = int(os.getenv("SEARCH_CACHE_MAX_RESULTS", "1000"))
+
+# Режим поиска top: сколько первых совпадений в названии ранжируется
+SEARCH_TOP_CANDIDATES = int(os.getenv("SEARCH_TOP_CANDIDATES", "1000"))
+
+# Кеш сериализованных ответов каталога (категории, карточки и списки товаров)
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "2048"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+# Дерево категорий в памяти воркера перечитывается не реже, чем раз в TTL секунд
+CATEGORY_TREE_TTL = float(os.getenv("CATEGORY_TREE_TTL", "300"))
+
+# Подсказки по названиям товаров: ответы на запросы не длиннее
+# SUGGEST_CACHE_MAX_LENGTH символов (самые частые префиксы) кешируются в памяти
+# воркера и при изменении товаров не сбрасываются, а устаревают через TTL
+SUGGEST_CACHE_MAXSIZE = int(os.getenv("SUGGEST_CACHE_MAXSIZE", "4096"))
+SUGGEST_CACHE_TTL = float(os.getenv("SUGGEST_CACHE_TTL", "60"))
+SUGGEST_CACHE_MAX_LENGTH = int(os.getenv("SUGGEST_CACHE_MAX_LENGTH", "3"))
+
+# Кеш активных пользователей для get_current_user и обновления токенов
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Пул потоков для bcrypt: число потоков и предел одновременных операций,
+# сверх которого запросы сразу получают 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 2))
+)
+
+# Предел тела multipart-запроса (форма товара с изображением до 2 МиБ
+# и полями формы). Проверяется до разбора формы: по Content-Length
+# и по мере чтения тела, поэтому сверх предела тело не читается
+MAX_MULTIPART_BODY_SIZE = int(
+    os.getenv("MAX_MULTIPART_BODY_SIZE", str(2 * 1024 * 1024 + 64 * 1024))
+)
+
+# Фоновая обработка изображений товаров: число процессов и форматы производных
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_VARIANT_FORMATS = tuple(
+    fmt.strip().lower()
+    for fmt in os.getenv("IMAGE_VARIANT_FORMATS", "webp,avif").split(",")
+    if fmt.strip()
+)
+
+# Реплики PostgreSQL для чтения каталога (через запятую). Реплика, отставшая
+# больше чем на REPLICA_MAX_LAG секунд или недоступная, исключается из ротации
+# до следующей проверки, которая выполняется не чаще раза в интервал
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("REPLICA_HEALTH_CHECK_TIMEOUT", "1"))
+
+# Массовая загрузка товаров: строк в одном COPY и сколько ошибок по строкам
+# сохраняется в задаче загрузки
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "5000"))
+PRODUCT_IMPORT_MAX_ERRORS = int(os.getenv("PRODUCT_IMPORT_MAX_ERRORS", "1000"))
+
+# Лог SQL: SQL_ECHO=true пишет в лог каждый запрос (только для отладки).
+# Запросы дольше SQL_SLOW_QUERY_MS миллисекунд пишутся всегда, запрос одной
+# формы, повторённый за HTTP-запрос SQL_N_PLUS_ONE_THRESHOLD раз, считается N+1.
+# SQL_DEBUG_HEADERS=true добавляет счётчики запросов в заголовки ответа X-DB-*
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Каталог файлов метрик Prometheus, общий для воркеров gunicorn
+# (см. app/gunicorn_conf.py); без него метрики считаются в одном процессе
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Хранилище корзин: sql — таблица cart_items; memory или redis — key-value
+# хранилище, из которого изменённые корзины раз в CART_FLUSH_INTERVAL секунд
+# пачками записываются в cart_items
+CART_STORAGE = os.getenv("CART_STORAGE", "sql")
+CART_REDIS_URL = os.getenv("CART_REDIS_URL", "redis://localhost:6379/0")
+CART_FLUSH_INTERVAL = float(os.getenv("CART_FLUSH_INTERVAL", "1"))
+CART_FLUSH_BATCH_SIZE = int(os.getenv("CART_FLUSH_BATCH_SIZE", "500"))
+CART_KV_TTL = int(os.getenv("CART_KV_TTL", str(7 * 24 * 3600)))
+
+# На сколько строк-сегментов делится дневная строка продаж товара
+SELLER_ROLLUP_SHARDS = int(os.getenv("SELLER_ROLLUP_SHARDS", "4"))
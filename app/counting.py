@@ -0,0 +1,151 @@
+import json
+from collections.abc import Hashable
+
+from sqlalchemy import Numeric, func, select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.cache import MISSING, TTLCache
+from app.config import (
+    PRODUCT_COUNT_CACHE_TTL,
+    PRODUCT_COUNT_EXACT_THRESHOLD,
+    PRODUCT_PRICE_FACET_BOUNDS,
+)
+from app.models.products import Product as ProductModel
+from app.replicas import replica_router
+from app.search_cache import invalidate_search_results
+
+# Кеш total по нормализованному набору фильтров: ключ -> (total, total_exact)
+product_count_cache = TTLCache(
+    "product_counts", maxsize=1024, ttl=PRODUCT_COUNT_CACHE_TTL
+)
+
+# Кеш фасетов по тому же ключу фильтров: ключ -> dict по схеме ProductFacets
+product_facet_cache = TTLCache(
+    "product_facets", maxsize=1024, ttl=PRODUCT_COUNT_CACHE_TTL
+)
+
+
+def product_filter_key(**params) -> tuple:
+    """
+    Нормализует параметры фильтрации в хешируемый ключ кеша.
+    Пустые параметры отбрасываются, поисковая строка приводится к нижнему
+    регистру с единичными пробелами.
+    """
+    normalized = []
+    for name, value in sorted(params.items()):
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+async def estimate_row_count(db: AsyncSession, stmt: Select) -> int:
+    """
+    Возвращает оценку числа строк запроса по плану из EXPLAIN, не выполняя его.
+    """
+    conn = await db.connection()
+    compiled = stmt.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = compiled.construct_params()
+    args = tuple(params[name] for name in compiled.positiontup or ())
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", args)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_products(
+    db: AsyncSession, filters: list, cache_key: Hashable, mode: str = "auto"
+) -> tuple[int, bool]:
+    """
+    Возвращает (total, total_exact) для активных товаров с заданными фильтрами.
+
+    Режимы:
+    - exact — всегда точный COUNT;
+    - estimate — оценка планировщика;
+    - auto — точный COUNT для небольших выборок, оценка для больших.
+    Результат кешируется по нормализованному ключу фильтров.
+    """
+    cached = product_count_cache.get(cache_key)
+    if cached is not MISSING and (mode != "exact" or cached[1]):
+        return cached
+    version = product_count_cache.version
+
+    count_stmt = select(func.count()).select_from(ProductModel).where(*filters)
+    if mode == "exact":
+        result = (await db.scalar(count_stmt) or 0, True)
+    else:
+        estimate = await estimate_row_count(db, select(ProductModel.id).where(*filters))
+        if mode == "auto" and estimate < PRODUCT_COUNT_EXACT_THRESHOLD:
+            result = (await db.scalar(count_stmt) or 0, True)
+        else:
+            result = (estimate, False)
+
+    product_count_cache.set(cache_key, result, version=version)
+    return result
+
+
+async def product_facets(db: AsyncSession, filters: list, cache_key: Hashable) -> dict:
+    """
+    Считает фасеты активных товаров с заданными фильтрами одним запросом:
+    GROUPING SETS группирует отфильтрованные строки отдельно по категории,
+    наличию и ценовому диапазону. Результат кешируется по ключу фильтров.
+    """
+    cached = product_facet_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    version = product_facet_cache.version
+
+    # Как и фильтр in_stock, не учитывает сегменты флеш-распродажи:
+    # до её завершения products.stock не уменьшается
+    in_stock = (ProductModel.stock > 0).label("in_stock")
+    # 0 — дешевле первой границы, i — от границы i-1 до границы i
+    price_range = func.width_bucket(
+        ProductModel.price, array(PRODUCT_PRICE_FACET_BOUNDS, type_=Numeric)
+    ).label("price_range")
+    rows = await db.execute(
+        select(ProductModel.category_id, in_stock, price_range, func.count())
+        .where(*filters)
+        .group_by(func.grouping_sets(ProductModel.category_id, in_stock, price_range))
+    )
+
+    # Колонки NOT NULL, поэтому NULL в строке означает «не в этом наборе»
+    facets = {"categories": [], "in_stock": 0, "out_of_stock": 0, "price_ranges": []}
+    for category_id, has_stock, bucket, count in rows:
+        if category_id is not None:
+            facets["categories"].append({"category_id": category_id, "count": count})
+        elif has_stock is not None:
+            facets["in_stock" if has_stock else "out_of_stock"] = count
+        else:
+            bounds = [None, *PRODUCT_PRICE_FACET_BOUNDS, None]
+            facets["price_ranges"].append(
+                {
+                    "min_price": bounds[bucket],
+                    "max_price": bounds[bucket + 1],
+                    "count": count,
+                }
+            )
+    facets["categories"].sort(key=lambda item: (-item["count"], item["category_id"]))
+    facets["price_ranges"].sort(
+        key=lambda item: item["min_price"] if item["min_price"] is not None else -1
+    )
+
+    product_facet_cache.set(cache_key, facets, version=version)
+    return facets
+
+
+def invalidate_product_counts() -> None:
+    """
+    Сбрасывает закешированные total, фасеты и выдачу поиска после создания,
+    изменения или удаления товара.
+    """
+    replica_router.read_from_primary()
+    product_count_cache.clear()
+    product_facet_cache.clear()
+    invalidate_search_results()
@@ -2,13 +2,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-from app.config import DATABASE_URL
+from app.config import DATABASE_REPLICA_URLS, DATABASE_URL, SQL_ECHO
+from app.metrics import InstrumentedQueuePool, instrument_engine
+from app.query_stats import instrument_queries
 
 # Строка подключения для SQLite
 DATABASE_URL_SQLITE = "sqlite:///ecommerce.db"
 
 # Создаём Engine
-engine = create_engine(DATABASE_URL_SQLITE, echo=True)
+engine = create_engine(DATABASE_URL_SQLITE, echo=SQL_ECHO)
 
 # Настраиваем фабрику сеансов
 SessionLocal = sessionmaker(bind=engine)
@@ -16,11 +18,27 @@ SessionLocal = sessionmaker(bind=engine)
 # --------------- Асинхронное подключение к PostgreSQL -------------------------
 
 # Создаём Engine
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+async_engine = create_async_engine(
+    DATABASE_URL, echo=SQL_ECHO, poolclass=InstrumentedQueuePool
+)
+instrument_engine(async_engine, "primary")
+instrument_queries(async_engine)
 
 # Настраиваем фабрику сеансов
 async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False)
 
+# Engine и фабрики сеансов реплик только для чтения (см. app/replicas.py)
+replica_engines = [
+    create_async_engine(url, echo=SQL_ECHO, poolclass=InstrumentedQueuePool)
+    for url in DATABASE_REPLICA_URLS
+]
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine, f"replica-{index}")
+    instrument_queries(replica_engine)
+replica_session_makers = [
+    async_sessionmaker(engine, expire_on_commit=False) for engine in replica_engines
+]
+
 
 # Определяем базовый класс для моделей
 class Base(DeclarativeBase):
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal, async_session_maker
+from app.replicas import replica_router
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -30,3 +31,15 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
     async with async_session_maker() as session:
         yield session
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Предоставляет сессию только для чтения: с реплики, если она настроена
+    и не отстаёт, иначе с мастера. Данные могут отставать от мастера
+    не больше чем на REPLICA_MAX_LAG секунд, поэтому зависимость подходит
+    только эндпоинтам, которым не нужно читать собственные записи.
+    """
+    session_maker = await replica_router.pick() or async_session_maker
+    async with session_maker() as session:
+        yield session
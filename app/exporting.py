@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.database import async_session_maker
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Строк, читаемых с сервера за раз и отправляемых одним куском ответа
+EXPORT_BATCH_SIZE = 1000
+# Начало ячейки, которое Excel и подобные программы разбирают как формулу
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_cell(value):
+    """
+    Экранирует строку, которую табличный редактор выполнил бы как формулу
+    (CSV injection), префиксом-апострофом. Числа и даты не меняются.
+    """
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def _iter_export(stmt: Select, export_format: str) -> AsyncIterator[str]:
+    """
+    Читает результат запроса серверным курсором пачками по EXPORT_BATCH_SIZE
+    строк и отдаёт их уже сериализованными. В памяти держится одна пачка.
+    Сессия открывается здесь: ответ отправляется после выхода из обработчика.
+    """
+    async with async_session_maker() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if export_format == "csv":
+            writer.writerow(columns)
+
+        async for partition in result.partitions():
+            for row in partition:
+                if export_format == "csv":
+                    writer.writerow([_csv_cell(value) for value in row])
+                else:
+                    buffer.write(
+                        json.dumps(
+                            dict(zip(columns, row)),
+                            default=_json_default,
+                            ensure_ascii=False,
+                        )
+                    )
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def export_response(
+    stmt: Select, export_format: str, filename: str
+) -> StreamingResponse:
+    """
+    Потоково отдаёт строки запроса в формате ndjson или csv.
+    """
+    return StreamingResponse(
+        _iter_export(stmt, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
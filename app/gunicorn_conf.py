@@ -0,0 +1,20 @@
+import os
+import shutil
+
+# Воркеры пишут метрики Prometheus в общий каталог; переменная должна быть
+# задана до импорта приложения, поэтому выставляется здесь, в мастере
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc"
+)
+
+
+def on_starting(server):
+    # Файлы прошлого запуска исказили бы счётчики
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
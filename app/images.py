@@ -0,0 +1,190 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from sqlalchemy import update
+
+from app.cache import invalidate_product_cache
+from app.config import IMAGE_VARIANT_FORMATS, IMAGE_WORKERS
+from app.database import async_session_maker
+from app.models.products import Product as ProductModel
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MEDIA_ROOT = BASE_DIR / "media" / "products"
+MEDIA_URL = "/media/products/"
+
+# Размеры производных изображений: вписываются в квадрат со стороной N пикселей
+IMAGE_VARIANT_SIZES = {"thumb": 200, "medium": 800}
+IMAGE_VARIANT_QUALITY = {"webp": 80, "avif": 60}
+
+# Процессы создаются лениво, при первой загрузке изображения.
+# Контекст spawn: дочерний процесс не наследует event loop и соединения с БД
+_executor: ProcessPoolExecutor | None = None
+# Ссылки на незавершённые задачи, чтобы их не собрал сборщик мусора
+_pending: set[asyncio.Future] = set()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def variant_name(file_name: str, size: str, fmt: str) -> str:
+    return f"{Path(file_name).stem}_{size}.{fmt}"
+
+
+def image_variant_urls(
+    image_url: str | None, variant_files: list[str]
+) -> dict[str, dict[str, str]] | None:
+    """
+    Возвращает URL производных изображений вида {"thumb": {"webp": url}}
+    только для уже созданных файлов variant_files. None, пока фоновая
+    обработка не завершилась, — тогда показывается оригинал.
+    """
+    if not image_url or not image_url.startswith(MEDIA_URL) or not variant_files:
+        return None
+    file_name = image_url.removeprefix(MEDIA_URL)
+    existing = set(variant_files)
+    variants = {}
+    for size in IMAGE_VARIANT_SIZES:
+        urls = {
+            fmt: MEDIA_URL + name
+            for fmt in IMAGE_VARIANT_FORMATS
+            if (name := variant_name(file_name, size, fmt)) in existing
+        }
+        if urls:
+            variants[size] = urls
+    return variants or None
+
+
+def variant_paths(file_name: str) -> list[Path]:
+    return [
+        MEDIA_ROOT / variant_name(file_name, size, fmt)
+        for size in IMAGE_VARIANT_SIZES
+        for fmt in IMAGE_VARIANT_FORMATS
+    ]
+
+
+def generate_image_variants(file_name: str) -> list[str]:
+    """
+    Создаёт уменьшенные копии изображения во всех настроенных форматах.
+    Выполняется в отдельном процессе; возвращает имена созданных файлов.
+    """
+    from PIL import Image, ImageOps, features
+
+    source_path = MEDIA_ROOT / file_name
+    created = []
+    try:
+        original = Image.open(source_path)
+    except FileNotFoundError:
+        # Товар удалили раньше, чем до изображения дошла очередь
+        return []
+    with original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for size, side in IMAGE_VARIANT_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((side, side), Image.Resampling.LANCZOS)
+            for fmt in IMAGE_VARIANT_FORMATS:
+                if not features.check(fmt):
+                    continue
+                target = MEDIA_ROOT / variant_name(file_name, size, fmt)
+                tmp_path = target.with_name(target.name + ".part")
+                variant.save(
+                    tmp_path, format=fmt, quality=IMAGE_VARIANT_QUALITY.get(fmt, 80)
+                )
+                os.replace(tmp_path, target)
+                created.append(target.name)
+
+    # Оригинал могли удалить, пока шла обработка, — не оставляем сирот
+    if not source_path.exists():
+        for path in variant_paths(file_name):
+            path.unlink(missing_ok=True)
+        return []
+    return created
+
+
+def schedule_image_variants(image_url: str) -> None:
+    """
+    Ставит создание производных изображений в очередь пула процессов
+    и сразу возвращает управление, не дожидаясь результата. Вызывается
+    после коммита товара: имена созданных файлов записываются в его строку.
+    """
+    file_name = image_url.removeprefix(MEDIA_URL)
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    task = loop.run_in_executor(executor, generate_image_variants, file_name)
+    _pending.add(task)
+    task.add_done_callback(functools.partial(_on_variants_done, executor, image_url))
+
+
+async def store_image_variants(image_url: str, variant_files: list[str]) -> None:
+    """
+    Записывает созданные производные в товары с этим изображением
+    и сбрасывает их кеш. Если изображение успели заменить, ничего не меняет.
+    """
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(ProductModel)
+            .where(ProductModel.image_url == image_url)
+            .values(image_variant_files=variant_files)
+            .returning(ProductModel.id, ProductModel.category_id)
+        )
+        products = result.all()
+        await db.commit()
+    for product_id, category_id in products:
+        invalidate_product_cache(product_id, category_id)
+
+
+def _on_variants_done(
+    executor: ProcessPoolExecutor, image_url: str, task: asyncio.Future
+) -> None:
+    global _executor
+    _pending.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is None:
+        variant_files = task.result()
+        if variant_files:
+            store = asyncio.ensure_future(
+                store_image_variants(image_url, variant_files)
+            )
+            _pending.add(store)
+            store.add_done_callback(_on_variants_stored)
+        return
+    logger.error("Failed to generate image variants", exc_info=error)
+    # Упавший процесс ломает весь пул — следующая загрузка создаст новый.
+    # Задачи сломанного пула уже не выполнятся, их процессы нужно остановить
+    if isinstance(error, BrokenProcessPool):
+        executor.shutdown(wait=False, cancel_futures=True)
+        if _executor is executor:
+            _executor = None
+
+
+def _on_variants_stored(task: asyncio.Future) -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to store image variants", exc_info=task.exception())
+
+
+def remove_image_files(file_path: Path) -> None:
+    """
+    Удаляет оригинал изображения и все его производные.
+    """
+    file_path.unlink(missing_ok=True)
+    for path in variant_paths(file_path.name):
+        path.unlink(missing_ok=True)
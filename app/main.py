@@ -1,7 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 
-from app.routers import cart, categories, orders, products, reviews, users
+from app.body_limit import MultipartBodyLimitMiddleware
+from app.cache import cache_stats
+from app.metrics import MetricsMiddleware, render_metrics
+from app.query_stats import QueryStatsMiddleware
+from app.routers import (
+    cart,
+    categories,
+    orders,
+    products,
+    reviews,
+    sellers,
+    users,
+)
 
 # Создаём приложение FastAPI
 app = FastAPI(
@@ -16,6 +28,11 @@ app.include_router(users.router)
 app.include_router(reviews.router)
 app.include_router(cart.router)
 app.include_router(orders.router)
+app.include_router(sellers.router)
+
+app.add_middleware(MultipartBodyLimitMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.mount("/media", StaticFiles(directory="media"), name="media")
 
@@ -27,3 +44,20 @@ async def root():
     Корневой маршрут, подтверждающий, что API работает.
     """
     return {"message": "Добро пожаловать в API интернет-магазина!"}
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Возвращает счётчики попаданий, промахов и вытеснений кешей текущего воркера.
+    """
+    return cache_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики всех воркеров в текстовом формате Prometheus.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
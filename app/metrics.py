@@ -0,0 +1,156 @@
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import PROMETHEUS_MULTIPROC_DIR
+
+# Под gunicorn каждый воркер пишет значения в файлы каталога
+# PROMETHEUS_MULTIPROC_DIR, а /metrics любого воркера суммирует их все.
+# Gauge в режиме livesum складываются только по живым процессам.
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Обработанные HTTP-запросы",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса до отправки последнего байта ответа",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP-запросы, обрабатываемые в данный момент",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Выдачи соединений из пула", ["pool"]
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Ожидание соединения из пула",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения, выданные из пула в данный момент",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+# Доля попаданий: sum(rate(cache_lookups_total{result="hit"}[5m]))
+# / sum(rate(cache_lookups_total[5m])) по нужному кешу
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Обращения к кешам в памяти", ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total", "Вытеснения из кешей в памяти", ["cache"]
+)
+
+# Метка маршрута для запросов, не попавших ни в один маршрут API
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время ожидания свободного соединения.
+    Имя пула для метрик задаёт instrument_engine.
+    """
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """
+    Подключает к пулу engine счётчики выдачи соединений. Engine должен
+    быть создан с poolclass=InstrumentedQueuePool.
+    """
+    pool = engine.sync_engine.pool
+    pool.metrics_name = name
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+        checked_out.inc()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, считающее запросы и время их обработки по шаблону
+    маршрута (/products/{product_id}), методу и статусу ответа.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Маршрут записывается в scope при сопоставлении запроса
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path).observe(duration)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Возвращает метрики в текстовом формате Prometheus и их Content-Type.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
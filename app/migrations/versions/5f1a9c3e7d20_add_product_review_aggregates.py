@@ -0,0 +1,52 @@
+"""Add product review aggregates
+
+Revision ID: 5f1a9c3e7d20
+Revises: 8c3d5a7e2b14
+Create Date: 2026-10-17 14:05:52.731904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1a9c3e7d20'
+down_revision: Union[str, Sequence[str], None] = '8c3d5a7e2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    rating становится вычисляемой колонкой. Агрегаты существующих отзывов
+    заполняются здесь же, до замены колонки, чтобы рейтинг не обнулился.
+    """
+    op.add_column('products', sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('products', sa.Column('grade_sum', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE products p SET review_count = s.cnt, grade_sum = s.total "
+        "FROM (SELECT product_id, count(*) AS cnt, sum(grade) AS total "
+        "FROM reviews WHERE is_active GROUP BY product_id) s "
+        "WHERE s.product_id = p.id"
+    )
+    op.drop_index('ix_products_active_rating_id', table_name='products', postgresql_where=sa.text('is_active'))
+    op.drop_column('products', 'rating')
+    op.add_column('products', sa.Column('rating', sa.Numeric(precision=2, scale=1), sa.Computed('CASE WHEN review_count > 0 THEN round(grade_sum::numeric / review_count, 1) ELSE 0 END', persisted=True), nullable=False))
+    op.create_index('ix_products_active_rating_id', 'products', ['rating', 'id'], unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_active_rating_id', table_name='products', postgresql_where=sa.text('is_active'))
+    op.drop_column('products', 'rating')
+    op.add_column('products', sa.Column('rating', sa.Numeric(precision=2, scale=1), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE products SET rating = round(grade_sum::numeric / review_count, 1) "
+        "WHERE review_count > 0"
+    )
+    op.create_index('ix_products_active_rating_id', 'products', ['rating', 'id'], unique=False, postgresql_where=sa.text('is_active'))
+    op.drop_column('products', 'grade_sum')
+    op.drop_column('products', 'review_count')
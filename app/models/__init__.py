@@ -1,8 +1,22 @@
 from .cart_items import CartItem
 from .categories import Category
 from .orders import Order, OrderItem
+from .product_import_jobs import ProductImportJob
 from .products import Product
 from .reviews import Review
+from .seller_sales import SellerDailySales
+from .stock_buckets import ProductStockBucket
 from .users import User
 
-__all__ = ["Category", "Product", "User", "Review", "CartItem", "Order", "OrderItem"]
+__all__ = [
+    "Category",
+    "Product",
+    "User",
+    "Review",
+    "CartItem",
+    "Order",
+    "OrderItem",
+    "ProductStockBucket",
+    "ProductImportJob",
+    "SellerDailySales",
+]
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ProductImportJob(Base):
+    """
+    Массовая загрузка товаров продавцом.
+    Счётчики обновляются по мере обработки, поэтому ход загрузки
+    виден из других запросов, пока она идёт.
+    """
+
+    __tablename__ = "product_import_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seller_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    format: Mapped[str] = mapped_column(String(10), nullable=False)
+    # running -> completed | failed
+    status: Mapped[str] = mapped_column(String(20), default="running", nullable=False)
+    rows_processed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rows_imported: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rows_failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Ошибки по строкам: [{"row": 3, "error": "..."}], не больше IMPORT_MAX_ERRORS
+    errors: Mapped[list[dict]] = mapped_column(JSONB, default=list, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -11,8 +11,9 @@ from sqlalchemy import (
     Numeric,
     String,
     func,
+    text,
 )
-from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -26,7 +27,16 @@ class Product(Base):
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     image_url: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    # Имена созданных производных изображения; пусто, пока их не создала
+    # фоновая обработка
+    image_variant_files: Mapped[list[str]] = mapped_column(
+        ARRAY(String(200)), default=list, server_default="{}", nullable=False
+    )
     stock: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Число сегментов остатка во флеш-распродаже; 0 — обычный режим
+    stock_buckets: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     category_id: Mapped[int] = mapped_column(
         ForeignKey("categories.id"), nullable=False, index=True
@@ -34,8 +44,21 @@ class Product(Base):
     seller_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"), nullable=False, index=True
     )
+    # Агрегаты активных отзывов обновляются вместе с записью отзыва,
+    # рейтинг вычисляется из них базой
+    review_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    grade_sum: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     rating: Mapped[Decimal] = mapped_column(
-        Numeric(2, 1), default=0.0, server_default="0"
+        Numeric(2, 1),
+        Computed(
+            "CASE WHEN review_count > 0 "
+            "THEN round(grade_sum::numeric / review_count, 1) ELSE 0 END",
+            persisted=True,
+        ),
     )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -69,5 +92,45 @@ class Product(Base):
     order_items: Mapped[list["OrderItem"]] = relationship(  # type: ignore # noqa
         "OrderItem", back_populates="product"
     )
+    stock_bucket_rows: Mapped[list["ProductStockBucket"]] = relationship(  # type: ignore # noqa
+        "ProductStockBucket", back_populates="product", cascade="all, delete-orphan"
+    )
 
-    __table_args__ = (Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),)
+    __table_args__ = (
+        Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),
+        # Триграммы названий активных товаров для подсказок (расширение pg_trgm)
+        Index(
+            "ix_products_active_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_where=text("is_active"),
+        ),
+        # Названия в побайтовом порядке для подсказок по коротким префиксам:
+        # диапазон по индексу уже отсортирован, LIMIT обходится без сортировки
+        Index(
+            "ix_products_active_name_prefix",
+            text('lower(name) COLLATE "C"'),
+            "id",
+            postgresql_where=text("is_active"),
+        ),
+        # Индексы под курсорную пагинацию: (ключ сортировки, id) среди активных товаров
+        Index(
+            "ix_products_active_price_id",
+            "price",
+            "id",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_products_active_rating_id",
+            "rating",
+            "id",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_products_active_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_active"),
+        ),
+    )
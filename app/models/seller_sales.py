@@ -0,0 +1,29 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, ForeignKey, Integer, Numeric, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SellerDailySales(Base):
+    """
+    Продажи товара продавца за день (UTC): штуки и выручка.
+    Строка дня разбита на несколько сегментов (shard), чтобы одновременные
+    заказы одного товара не ждали друг друга на одной строке; при чтении
+    сегменты суммируются.
+    """
+
+    __tablename__ = "seller_daily_sales"
+
+    seller_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    units: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=0, nullable=False)
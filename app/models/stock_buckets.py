@@ -0,0 +1,28 @@
+from sqlalchemy import CheckConstraint, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database import Base
+
+
+class ProductStockBucket(Base):
+    """
+    Сегмент остатка товара в режиме флеш-распродажи.
+    Остаток горячего товара делится на несколько строк, чтобы одновременные
+    заказы списывали его из разных строк и не ждали друг друга.
+    """
+
+    __tablename__ = "product_stock_buckets"
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stock: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    product: Mapped["Product"] = relationship(  # type: ignore # noqa
+        "Product", back_populates="stock_bucket_rows"
+    )
+
+    __table_args__ = (
+        CheckConstraint("stock >= 0", name="check_bucket_stock_non_negative"),
+    )
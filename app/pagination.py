@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from fastapi import HTTPException, status
+
+# Допустимые сортировки списка товаров и тип значения ключа в курсоре
+CURSOR_VALUE_TYPES = {
+    "id": None,
+    "price": "decimal",
+    "rating": "decimal",
+    "created_at": "datetime",
+    "rank": "float",
+}
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    """
+    Кодирует позицию последнего элемента страницы в непрозрачный курсор.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    """
+    Декодирует курсор и возвращает пару (значение ключа сортировки, id).
+    Курсор, выданный для другой сортировки, считается невалидным.
+    """
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort or not isinstance(payload["id"], int):
+            raise invalid_cursor
+        value = payload.get("v")
+        value_type = CURSOR_VALUE_TYPES[sort]
+        if value_type == "decimal":
+            value = Decimal(value)
+        elif value_type == "datetime":
+            value = datetime.fromisoformat(value)
+        elif value_type == "float":
+            value = float(value)
+    except (
+        ValueError,
+        KeyError,
+        TypeError,
+        InvalidOperation,
+        binascii.Error,
+        UnicodeDecodeError,
+    ):
+        raise invalid_cursor
+    return value, payload["id"]
@@ -0,0 +1,270 @@
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy import column, insert, literal, select, table, text, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import PRODUCT_IMPORT_BATCH_SIZE, PRODUCT_IMPORT_MAX_ERRORS
+from app.database import async_session_maker
+from app.models.categories import Category as CategoryModel
+from app.models.product_import_jobs import ProductImportJob as ImportJobModel
+from app.models.products import Product as ProductModel
+from app.schemas import ProductCreate
+
+# Content-Type тела запроса -> формат загрузки
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+IMPORT_COLUMNS = ("name", "description", "price", "stock", "category_id")
+REQUIRED_COLUMNS = {"name", "price", "stock", "category_id"}
+# Запись длиннее этого предела считается повреждённым потоком
+MAX_RECORD_SIZE = 64 * 1024
+
+# Временная таблица живёт до конца транзакции загрузки
+STAGING_TABLE = "product_import_rows"
+CREATE_STAGING_SQL = text(
+    f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        name varchar(100) NOT NULL,
+        description varchar(500),
+        price numeric(10, 2) NOT NULL,
+        stock integer NOT NULL,
+        category_id integer NOT NULL
+    ) ON COMMIT DROP
+    """
+)
+staging = table(STAGING_TABLE, *(column(name) for name in IMPORT_COLUMNS))
+
+
+class ImportFormatError(ValueError):
+    """
+    Поток нельзя разобрать дальше: неверная кодировка, заголовок CSV
+    или слишком длинная запись.
+    """
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Режет поток байтов на строки, не держа в памяти больше одной записи.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    try:
+        async for chunk in stream:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line.removesuffix("\r")
+            if len(buffer) > MAX_RECORD_SIZE:
+                raise ImportFormatError("Record is too long")
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportFormatError("Body must be UTF-8 encoded")
+    if buffer:
+        yield buffer.removesuffix("\r")
+
+
+async def _iter_csv(
+    lines: AsyncIterator[str],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Отдаёт записи CSV. Поле в кавычках может содержать перевод строки:
+    запись закончена, когда число кавычек в ней чётное.
+    """
+    header: list[str] | None = None
+    pending = ""
+    row = 0
+    async for line in lines:
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            if len(pending) > MAX_RECORD_SIZE:
+                raise ImportFormatError("Record is too long")
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            missing = REQUIRED_COLUMNS - set(header)
+            if missing:
+                raise ImportFormatError(
+                    f"CSV header is missing columns: {', '.join(sorted(missing))}"
+                )
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield (
+            row,
+            {
+                name: value or None
+                for name, value in zip(header, values)
+                if name in IMPORT_COLUMNS
+            },
+        )
+    if pending:
+        raise ImportFormatError("Unterminated quoted field")
+    if header is None:
+        raise ImportFormatError("CSV header is missing")
+
+
+async def _iter_ndjson(
+    lines: AsyncIterator[str],
+) -> AsyncIterator[tuple[int, dict | str]]:
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield row, "Expected a JSON object"
+            continue
+        yield row, record
+
+
+def _validate(record: dict, category_ids: set[int]) -> tuple[tuple | None, str | None]:
+    """
+    Проверяет запись по схеме ProductCreate и набору активных категорий.
+    Возвращает строку для COPY или текст ошибки.
+    """
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return None, f"{field}: {error['msg']}" if field else error["msg"]
+    if product.category_id not in category_ids:
+        return None, "Category not found or inactive"
+    return (
+        product.name,
+        product.description,
+        product.price,
+        product.stock,
+        product.category_id,
+    ), None
+
+
+async def _update_job(job_id: int, **values) -> None:
+    """
+    Сохраняет состояние задачи в отдельной транзакции, чтобы ход загрузки
+    был виден до её завершения.
+    """
+    async with async_session_maker() as session:
+        await session.execute(
+            update(ImportJobModel).where(ImportJobModel.id == job_id).values(**values)
+        )
+        await session.commit()
+
+
+async def create_import_job(seller_id: int, import_format: str) -> ImportJobModel:
+    """
+    Создаёт задачу загрузки в отдельной транзакции.
+    """
+    async with async_session_maker() as session:
+        job = ImportJobModel(seller_id=seller_id, format=import_format)
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job
+
+
+async def run_product_import(
+    db: AsyncSession,
+    job: ImportJobModel,
+    stream: AsyncIterator[bytes],
+) -> set[int]:
+    """
+    Загружает товары из потока в одной транзакции: проверенные строки пачками
+    копируются (COPY) во временную таблицу, а в конце одним INSERT ... SELECT
+    переносятся в products. Ошибочные строки пропускаются и попадают в job.errors.
+    Возвращает ID категорий, в которые добавлены товары.
+    """
+    category_ids = set(
+        await db.scalars(select(CategoryModel.id).where(CategoryModel.is_active))
+    )
+    await db.execute(CREATE_STAGING_SQL)
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    lines = _iter_lines(stream)
+    records = _iter_csv(lines) if job.format == "csv" else _iter_ndjson(lines)
+    batch: list[tuple] = []
+    job.errors = []
+    touched_categories: set[int] = set()
+
+    async def flush() -> None:
+        if batch:
+            await driver_connection.copy_records_to_table(
+                STAGING_TABLE, records=batch, columns=IMPORT_COLUMNS
+            )
+            batch.clear()
+        await _update_job(
+            job.id,
+            rows_processed=job.rows_processed,
+            rows_failed=job.rows_failed,
+            errors=job.errors,
+        )
+
+    async for row, record in records:
+        job.rows_processed += 1
+        values, error = (
+            (None, record)
+            if isinstance(record, str)
+            else _validate(record, category_ids)
+        )
+        if error is not None:
+            job.rows_failed += 1
+            if len(job.errors) < PRODUCT_IMPORT_MAX_ERRORS:
+                job.errors.append({"row": row, "error": error})
+            continue
+        batch.append(values)
+        touched_categories.add(values[-1])
+        if len(batch) >= PRODUCT_IMPORT_BATCH_SIZE:
+            await flush()
+    await flush()
+
+    result = await db.execute(
+        insert(ProductModel).from_select(
+            [*IMPORT_COLUMNS, "seller_id", "is_active"],
+            select(*staging.c, literal(job.seller_id), true()),
+        )
+    )
+    await db.commit()
+
+    job.status = "completed"
+    job.rows_imported = result.rowcount
+    job.finished_at = datetime.now(timezone.utc)
+    await _update_job(
+        job.id,
+        status=job.status,
+        rows_imported=job.rows_imported,
+        finished_at=job.finished_at,
+    )
+    return touched_categories
+
+
+async def fail_import_job(job: ImportJobModel, error: str) -> None:
+    """
+    Помечает задачу неудавшейся; загруженные ею строки откатываются
+    вместе с транзакцией загрузки.
+    """
+    job.status = "failed"
+    job.finished_at = datetime.now(timezone.utc)
+    job.errors = [*job.errors, {"row": None, "error": error}]
+    await _update_job(
+        job.id, status=job.status, finished_at=job.finished_at, errors=job.errors
+    )
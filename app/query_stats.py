@@ -0,0 +1,144 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import SQL_DEBUG_HEADERS, SQL_N_PLUS_ONE_THRESHOLD, SQL_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """
+    SQL-запросы, выполненные при обработке одного HTTP-запроса.
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+    # Число выполнений каждого текста запроса (параметры в нём — плейсхолдеры)
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def repeated_statements(self) -> list[tuple[str, int]]:
+        """
+        Запросы одной формы, выполненные не меньше SQL_N_PLUS_ONE_THRESHOLD
+        раз, — признак N+1 (например, ленивая загрузка связи в цикле).
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= SQL_N_PLUS_ONE_THRESHOLD
+        ]
+
+
+# Статистика текущего HTTP-запроса; None вне запроса (команды, фоновые задачи)
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _parameter_shape(parameters, executemany: bool) -> str:
+    """
+    Описывает параметры запроса типами значений, не раскрывая сами значения.
+    """
+    if executemany:
+        rows = list(parameters)
+        first = _parameter_shape(rows[0], False) if rows else "()"
+        return f"{len(rows)} x {first}"
+    if isinstance(parameters, dict):
+        items = ", ".join(
+            f"{name}: {type(value).__name__}" for name, value in parameters.items()
+        )
+        return f"{{{items}}}"
+    return f"({', '.join(type(value).__name__ for value in parameters or ())})"
+
+
+def instrument_queries(engine: AsyncEngine) -> None:
+    """
+    Подключает к engine замер времени запросов: каждый запрос учитывается
+    в статистике текущего HTTP-запроса, медленные пишутся в лог.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+        if duration * 1000 >= SQL_SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query (%.1f ms): %s; parameters: %s",
+                duration * 1000,
+                statement,
+                _parameter_shape(parameters, executemany),
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware, собирающее статистику SQL-запросов каждого HTTP-запроса.
+    Повторяющиеся запросы (N+1) пишутся в лог; при SQL_DEBUG_HEADERS
+    счётчики добавляются в заголовки ответа X-DB-*.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and SQL_DEBUG_HEADERS:
+                # Запросы, выполненные при потоковой отдаче тела, сюда не попадут
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Query-Time-Ms"] = f"{stats.total_time * 1000:.1f}"
+                headers["X-DB-Slowest-Query-Ms"] = f"{stats.slowest_time * 1000:.1f}"
+                headers["X-DB-Repeated-Queries"] = str(len(stats.repeated_statements()))
+            await send(message)
+
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            for statement, count in stats.repeated_statements():
+                logger.warning(
+                    "Possible N+1 in %s %s: query executed %d times: %s",
+                    scope["method"],
+                    route,
+                    count,
+                    statement,
+                )
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import (
+    REPLICA_HEALTH_CHECK_INTERVAL,
+    REPLICA_HEALTH_CHECK_TIMEOUT,
+    REPLICA_MAX_LAG,
+)
+from app.database import replica_session_makers
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах. Если всё полученное WAL уже применено,
+# реплика догнала мастер, даже когда последняя транзакция была давно, —
+# но только пока WAL receiver подключён к мастеру: без него равенство LSN
+# значит лишь, что новых данных нет. NULL — отставание неизвестно
+# (receiver не в статусе streaming или нет времени последней транзакции).
+# Статус receiver виден пользователю с правами pg_read_all_stats (pg_monitor)
+REPLICATION_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class Replica:
+    """
+    Реплика и результат её последней проверки.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self.healthy = False
+        self.lag: float | None = None
+        self.checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> None:
+        """
+        Проверяет доступность и отставание реплики, если прошлая проверка устарела.
+        Пока проверку выполняет другой запрос, используется прежний результат.
+        """
+        if time.monotonic() - self.checked_at < REPLICA_HEALTH_CHECK_INTERVAL:
+            return
+        if self._lock.locked():
+            return
+        async with self._lock:
+            try:
+                self.lag = await asyncio.wait_for(
+                    self._fetch_lag(), timeout=REPLICA_HEALTH_CHECK_TIMEOUT
+                )
+                if self.lag is None:
+                    logger.warning("Replica lag is unknown, excluding it from rotation")
+                self.healthy = self.lag is not None and self.lag <= REPLICA_MAX_LAG
+            except Exception:
+                logger.warning("Replica health check failed", exc_info=True)
+                self.lag = None
+                self.healthy = False
+            self.checked_at = time.monotonic()
+
+    async def _fetch_lag(self) -> float | None:
+        async with self.session_maker() as session:
+            lag = await session.scalar(REPLICATION_LAG_SQL)
+            return float(lag) if lag is not None else None
+
+
+class ReplicaRouter:
+    """
+    Выбирает реплику для чтения по кругу, пропуская недоступные и отставшие.
+    """
+
+    def __init__(self, session_makers: list[async_sessionmaker]):
+        self.replicas = [Replica(maker) for maker in session_makers]
+        self._counter = itertools.count()
+        self._primary_until = float("-inf")
+
+    def read_from_primary(self) -> None:
+        """
+        Направляет чтения на мастер на REPLICA_MAX_LAG секунд. Вызывается
+        при инвалидации кешей после записи: иначе промах кеша прочитал бы
+        с реплики данные до записи и снова сохранил бы их в кеше.
+        """
+        self._primary_until = time.monotonic() + REPLICA_MAX_LAG
+
+    async def pick(self) -> async_sessionmaker | None:
+        """
+        Возвращает фабрику сеансов здоровой реплики или None, если таких нет
+        и читать нужно с мастера.
+        """
+        if not self.replicas or time.monotonic() < self._primary_until:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            await replica.refresh()
+            if replica.healthy:
+                return replica.session_maker
+        return None
+
+
+replica_router = ReplicaRouter(replica_session_makers)
@@ -1,13 +1,12 @@
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import delete, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.auth import get_current_user
+from app.cart_storage import cart_storage
 from app.db_depends import get_async_db
-from app.models.cart_items import CartItem as CartItemModel
 from app.models.products import Product as ProductModel
 from app.models.users import User as UserModel
 from app.schemas import (
@@ -19,53 +18,13 @@ from app.schemas import (
 from app.schemas import (
     CartItemCreate,
     CartItemUpdate,
+    CartSync,
 )
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
 
-async def _ensure_product_available(db: AsyncSession, product_id: int) -> None:
-    result = await db.scalars(
-        select(ProductModel).where(
-            ProductModel.id == product_id,
-            ProductModel.is_active,
-        )
-    )
-    product = result.first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found or inactive",
-        )
-
-
-async def _get_cart_item(
-    db: AsyncSession, user_id: int, product_id: int
-) -> CartItemModel | None:
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(
-            CartItemModel.user_id == user_id,
-            CartItemModel.product_id == product_id,
-        )
-    )
-    return result.first()
-
-
-@router.get("/", response_model=CartSchema)
-async def get_cart(
-    db: AsyncSession = Depends(get_async_db),
-    current_user: UserModel = Depends(get_current_user),
-):
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(CartItemModel.user_id == current_user.id)
-        .order_by(CartItemModel.id)
-    )
-    items = result.all()
-
+def _build_cart(user_id: int, items: list) -> CartSchema:
     total_quantity = sum(item.quantity for item in items)
     price_items = (
         Decimal(item.quantity)
@@ -75,13 +34,55 @@ async def get_cart(
     total_price_decimal = sum(price_items, Decimal("0"))
 
     return CartSchema(
-        user_id=current_user.id,
+        user_id=user_id,
         items=items,
         total_quantity=total_quantity,
         total_price=total_price_decimal,
     )
 
 
+@router.get("/", response_model=CartSchema)
+async def get_cart(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    items = await cart_storage.get_items(db, current_user.id)
+    return _build_cart(current_user.id, items)
+
+
+@router.put("/", response_model=CartSchema)
+async def sync_cart(
+    payload: CartSync,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Заменяет содержимое корзины переданным списком. Доступность товаров
+    проверяется одним запросом; в SQL-хранилище новые и изменённые позиции
+    записываются одним upsert, лишние удаляются одним DELETE.
+    Возвращает итоговую корзину.
+    """
+    quantities = {item.product_id: item.quantity for item in payload.items}
+
+    if quantities:
+        available = set(
+            await db.scalars(
+                select(ProductModel.id).where(
+                    ProductModel.id.in_(quantities), ProductModel.is_active
+                )
+            )
+        )
+        missing = sorted(quantities.keys() - available)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products not found or inactive: {missing}",
+            )
+
+    items = await cart_storage.replace(db, current_user.id, quantities)
+    return _build_cart(current_user.id, items)
+
+
 @router.post(
     "/items", response_model=CartItemSchema, status_code=status.HTTP_201_CREATED
 )
@@ -90,22 +91,12 @@ async def add_item_to_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    await _ensure_product_available(db, payload.product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    if cart_item:
-        cart_item.quantity += payload.quantity
-    else:
-        cart_item = CartItemModel(
-            user_id=current_user.id,
-            product_id=payload.product_id,
-            quantity=payload.quantity,
-        )
-        db.add(cart_item)
-
-    await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    return updated_item
+    """
+    Добавляет товар в корзину или увеличивает его количество.
+    """
+    return await cart_storage.add_item(
+        db, current_user.id, payload.product_id, payload.quantity
+    )
 
 
 @router.put("/items/{product_id}", response_model=CartItemSchema)
@@ -115,16 +106,12 @@ async def update_cart_item(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    await _ensure_product_available(db, product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-
-    cart_item.quantity = payload.quantity
-    await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, product_id)
-    return updated_item
+    """
+    Задаёт количество товара, который уже лежит в корзине.
+    """
+    return await cart_storage.update_item(
+        db, current_user.id, product_id, payload.quantity
+    )
 
 
 @router.delete("/items/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -133,12 +120,7 @@ async def remove_item_from_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-
-    await db.delete(cart_item)
-    await db.commit()
+    await cart_storage.remove_item(db, current_user.id, product_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -147,8 +129,5 @@ async def clear_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    await db.execute(
-        delete(CartItemModel).where(CartItemModel.user_id == current_user.id)
-    )
-    await db.commit()
+    await cart_storage.clear(db, current_user.id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
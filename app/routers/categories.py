@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_admin
-from app.db_depends import get_async_db
+from app.cache import cache_response, cached_response, catalog_cache
+from app.category_tree import get_category_tree, rebuild_category_tree
+from app.counting import invalidate_product_counts
+from app.db_depends import get_async_db, get_async_read_db
 from app.models.categories import Category as CategoryModel
 from app.models.users import User as UserModel
 from app.schemas import Category as CategorySchema
-from app.schemas import CategoryCreate
+from app.schemas import CategoryCreate, CategoryTreeNode
+
+CategoryListAdapter = TypeAdapter(list[CategorySchema])
 
 # Создаём маршрутизатор с префиксом и тегом
 router = APIRouter(
@@ -16,14 +22,38 @@ router = APIRouter(
 )
 
 
+def _on_categories_changed() -> None:
+    """
+    Сбрасывает кеши, зависящие от состава дерева категорий.
+    """
+    catalog_cache.delete(("categories",))
+    catalog_cache.invalidate_tag(("category_listing_tree",))
+    invalidate_product_counts()
+
+
 @router.get("/", response_model=list[CategorySchema])
-async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
+async def get_all_categories(db: AsyncSession = Depends(get_async_read_db)):
     """
     Возвращает список всех активных категорий.
     """
+    cache_key = ("categories",)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    version = catalog_cache.version
+
     result = await db.scalars(select(CategoryModel).where(CategoryModel.is_active))
     categories = result.all()
-    return categories
+    return cache_response(cache_key, CategoryListAdapter, categories, version)
+
+
+@router.get("/tree", response_model=list[CategoryTreeNode])
+async def get_categories_tree(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Возвращает дерево активных категорий из снимка в памяти воркера.
+    """
+    snapshot = await get_category_tree(db)
+    return snapshot.as_tree()
 
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
@@ -52,6 +82,8 @@ async def create_category(
     db_category = CategoryModel(**category.model_dump())
     db.add(db_category)
     await db.commit()
+    await rebuild_category_tree(db)
+    _on_categories_changed()
     return db_category
 
 
@@ -102,6 +134,8 @@ async def update_category(
         .values(**update_data)
     )
     await db.commit()
+    await rebuild_category_tree(db)
+    _on_categories_changed()
     return db_category
 
 
@@ -130,4 +164,9 @@ async def delete_category(
         .values(is_active=False)
     )
     await db.commit()
+    await rebuild_category_tree(db)
+    _on_categories_changed()
+    # Товары неактивной категории больше не отдаются ни списком, ни карточкой
+    catalog_cache.invalidate_tag(("category_listing", category_id))
+    catalog_cache.invalidate_tag(("category", category_id))
     return db_category
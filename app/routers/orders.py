@@ -1,3 +1,4 @@
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -5,24 +6,74 @@ from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.auth import get_current_user
+from app.auth import get_current_admin, get_current_user
+from app.cache import invalidate_product_cache
+from app.cart_storage import cart_storage
+from app.counting import invalidate_product_counts
 from app.db_depends import get_async_db
+from app.exporting import export_response
 from app.models.cart_items import CartItem as CartItemModel
 from app.models.orders import Order as OrderModel
 from app.models.orders import OrderItem as OrderItemModel
+from app.models.products import Product as ProductModel
 from app.models.users import User as UserModel
 from app.schemas import Order as OrderSchema
-from app.schemas import OrderList
+from app.schemas import OrderList, OrderSummaryList
+from app.seller_rollups import record_sales
+from app.stock import take_stock
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Позиции заказа с товаром: загружаются только колонки товара из схемы Product,
+# без поискового вектора tsv и служебных полей
+ORDER_ITEMS_WITH_PRODUCT = (
+    selectinload(OrderModel.items)
+    .selectinload(OrderItemModel.product)
+    .load_only(
+        ProductModel.id,
+        ProductModel.name,
+        ProductModel.description,
+        ProductModel.price,
+        ProductModel.image_url,
+        ProductModel.image_variant_files,
+        ProductModel.stock,
+        ProductModel.category_id,
+        ProductModel.is_active,
+    )
+)
+
+EXPORT_FORMAT_QUERY = Query(
+    "ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson или csv"
+)
+
+
+def _order_export_query():
+    """
+    Строки выгрузки: одна на позицию заказа, в порядке оформления заказов.
+    """
+    return (
+        select(
+            OrderModel.id.label("order_id"),
+            OrderModel.user_id,
+            OrderModel.status,
+            OrderModel.created_at,
+            OrderModel.total_amount,
+            OrderItemModel.product_id,
+            ProductModel.name.label("product_name"),
+            OrderItemModel.quantity,
+            OrderItemModel.unit_price,
+            OrderItemModel.total_price,
+        )
+        .join(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .join(ProductModel, ProductModel.id == OrderItemModel.product_id)
+        .order_by(OrderModel.created_at, OrderModel.id, OrderItemModel.id)
+    )
+
 
 async def _load_order_with_items(db: AsyncSession, order_id: int) -> OrderModel | None:
     result = await db.scalars(
         select(OrderModel)
-        .options(
-            selectinload(OrderModel.items).selectinload(OrderItemModel.product),
-        )
+        .options(ORDER_ITEMS_WITH_PRODUCT)
         .where(OrderModel.id == order_id)
     )
     return result.first()
@@ -39,6 +90,9 @@ async def checkout_order(
     Создаёт заказ на основе текущей корзины пользователя.
     Сохраняет позиции заказа, вычитает остатки и очищает корзину.
     """
+    # Корзина из key-value хранилища записывается в cart_items в этой же
+    # транзакции, и заказ собирается из этого снимка
+    await cart_storage.prepare_checkout(db, current_user.id)
     cart_result = await db.scalars(
         select(CartItemModel)
         .options(selectinload(CartItemModel.product))
@@ -61,11 +115,6 @@ async def checkout_order(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Product {cart_item.product_id} is unavailable",
             )
-        if product.stock < cart_item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Not enough stock for product {product.name}",
-            )
 
         unit_price = product.price
         if unit_price is None:
@@ -84,15 +133,47 @@ async def checkout_order(
         )
         order.items.append(order_item)
 
-        product.stock -= cart_item.quantity
+    # Списываем остатки условными UPDATE в порядке product_id, чтобы
+    # параллельные заказы блокировали строки в одном порядке и не взаимоблокировались.
+    # При нехватке исключение откатывает всю транзакцию, включая уже списанное.
+    for cart_item in sorted(cart_items, key=lambda item: item.product_id):
+        if not await take_stock(db, cart_item.product, cart_item.quantity):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not enough stock for product {cart_item.product.name}",
+            )
 
     order.total_amount = total_amount
     db.add(order)
+    await record_sales(
+        db,
+        [
+            (
+                cart_item.product.seller_id,
+                item.product_id,
+                item.quantity,
+                item.total_price,
+            )
+            for cart_item, item in zip(cart_items, order.items)
+        ],
+    )
 
     await db.execute(
         delete(CartItemModel).where(CartItemModel.user_id == current_user.id)
     )
     await db.commit()
+    await cart_storage.after_checkout(
+        current_user.id,
+        {cart_item.product_id: cart_item.quantity for cart_item in cart_items},
+    )
+
+    # Остатки изменились — сбрасываем кеш карточек и списков купленных товаров.
+    # Во флеш-распродаже products.stock не меняется, и карточка остаётся в кеше.
+    products = [item.product for item in cart_items if not item.product.stock_buckets]
+    for product in products:
+        invalidate_product_cache(product.id, product.category_id)
+    if any(product.stock == 0 for product in products):
+        invalidate_product_counts()
 
     created_order = await _load_order_with_items(db, order.id)
     if not created_order:
@@ -103,10 +184,16 @@ async def checkout_order(
     return created_order
 
 
-@router.get("/", response_model=OrderList)
+@router.get("/", response_model=OrderList | OrderSummaryList)
 async def list_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    view: str = Query(
+        "full",
+        pattern="^(full|summary)$",
+        description="full — заказы с позициями и товарами, "
+        "summary — только сведения о заказе и число позиций",
+    ),
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
@@ -116,9 +203,34 @@ async def list_orders(
     total = await db.scalar(
         select(func.count(OrderModel.id)).where(OrderModel.user_id == current_user.id)
     )
+
+    if view == "summary":
+        # Один агрегирующий запрос без загрузки позиций и товаров
+        result = await db.execute(
+            select(
+                OrderModel.id,
+                OrderModel.status,
+                OrderModel.total_amount,
+                OrderModel.created_at,
+                func.count(OrderItemModel.id).label("items_count"),
+            )
+            .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+            .where(OrderModel.user_id == current_user.id)
+            .group_by(OrderModel.id)
+            .order_by(OrderModel.created_at.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        return OrderSummaryList(
+            items=result.mappings().all(),
+            total=total or 0,
+            page=page,
+            page_size=page_size,
+        )
+
     result = await db.scalars(
         select(OrderModel)
-        .options(selectinload(OrderModel.items).selectinload(OrderItemModel.product))
+        .options(ORDER_ITEMS_WITH_PRODUCT)
         .where(OrderModel.user_id == current_user.id)
         .order_by(OrderModel.created_at.desc())
         .offset((page - 1) * page_size)
@@ -129,6 +241,43 @@ async def list_orders(
     return OrderList(items=orders, total=total or 0, page=page, page_size=page_size)
 
 
+@router.get("/export")
+async def export_orders(
+    export_format: str = EXPORT_FORMAT_QUERY,
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Потоково выгружает всю историю заказов текущего пользователя,
+    по строке на позицию заказа.
+    """
+    stmt = _order_export_query().where(OrderModel.user_id == current_user.id)
+    return export_response(stmt, export_format, "orders")
+
+
+@router.get("/admin/export")
+async def export_all_orders(
+    date_from: date = Query(..., description="Первый день периода"),
+    date_to: date = Query(..., description="Последний день периода включительно"),
+    export_format: str = EXPORT_FORMAT_QUERY,
+    current_user: UserModel = Depends(get_current_admin),
+):
+    """
+    Потоково выгружает заказы всех пользователей за период (дни по UTC),
+    по строке на позицию заказа. Только для 'admin'.
+    """
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_to must not be earlier than date_from",
+        )
+    start = datetime.combine(date_from, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    stmt = _order_export_query().where(
+        OrderModel.created_at >= start, OrderModel.created_at < end
+    )
+    return export_response(stmt, export_format, f"orders_{date_from}_{date_to}")
+
+
 @router.get("/{order_id}", response_model=OrderSchema)
 async def get_order(
     order_id: int,
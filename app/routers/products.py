@@ -1,24 +1,89 @@
+import os
+import shutil
+import tempfile
 import uuid
 from datetime import datetime
 from pathlib import Path
-
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
-from sqlalchemy import desc, func, select, update
+from typing import BinaryIO
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    ARRAY,
+    Integer,
+    and_,
+    any_,
+    desc,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_seller
-from app.db_depends import get_async_db
+from app.cache import (
+    MISSING,
+    cache_response,
+    cached_response,
+    catalog_cache,
+    invalidate_product_cache,
+    suggest_cache,
+)
+from app.category_tree import get_category_tree
+from app.config import SEARCH_TOP_CANDIDATES, SUGGEST_CACHE_MAX_LENGTH
+from app.counting import (
+    count_products,
+    invalidate_product_counts,
+    product_facets,
+    product_filter_key,
+)
+from app.db_depends import get_async_db, get_async_read_db
+from app.images import BASE_DIR, MEDIA_ROOT, remove_image_files, schedule_image_variants
 from app.models.categories import Category as CategoryModel
+from app.models.product_import_jobs import ProductImportJob as ImportJobModel
 from app.models.products import Product as ProductModel
 from app.models.users import User as UserModel
+from app.pagination import decode_cursor, encode_cursor
+from app.product_import import (
+    IMPORT_FORMATS,
+    ImportFormatError,
+    create_import_job,
+    fail_import_job,
+    run_product_import,
+)
+from app.schemas import FlashSaleStart, ProductCreate, ProductList
 from app.schemas import Product as ProductSchema
-from app.schemas import ProductCreate, ProductList
+from app.schemas import ProductImportJob as ImportJobSchema
+from app.schemas import ProductSuggestion as SuggestionSchema
+from app.search_cache import cached_search_page
+from app.stock import merge_stock, split_stock
 
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-MEDIA_ROOT = BASE_DIR / "media" / "products"
 MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 MAX_IMAGE_SIZE = 2 * 1024 * 1024  # 2 097 152 байт
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+ProductAdapter = TypeAdapter(ProductSchema)
+ProductListAdapter = TypeAdapter(list[ProductSchema])
+SuggestionListAdapter = TypeAdapter(list[SuggestionSchema])
+# Более короткий запрос совпадает с большой долей каталога, и индекс
+# триграмм его не ограничивает: такие префиксы ищутся диапазоном по btree
+SUGGEST_FUZZY_MIN_LENGTH = 3
 
 # Создаём маршрутизатор для товаров
 router = APIRouter(
@@ -27,11 +92,24 @@ router = APIRouter(
 )
 
 
+# Ключи сортировки списка товаров: колонка и направление (True — по убыванию).
+# Для каждой сортировки есть составной частичный индекс (колонка, id) WHERE is_active.
+SORT_COLUMNS = {
+    "id": (ProductModel.id, False),
+    "price": (ProductModel.price, False),
+    "rating": (ProductModel.rating, True),
+    "created_at": (ProductModel.created_at, True),
+}
+
+
 @router.get("/", response_model=ProductList, status_code=status.HTTP_200_OK)
 async def get_all_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     category_id: int | None = Query(None, description="ID категории для фильтрации"),
+    include_descendants: bool = Query(
+        False, description="true — фильтр по категории включает все подкатегории"
+    ),
     search: str | None = Query(
         None, min_length=1, description="Поиск по названию товара"
     ),
@@ -42,10 +120,41 @@ async def get_all_products(
     ),
     seller_id: int | None = Query(None, description="ID продавца для фильтрации"),
     created_at: datetime = Query(None, description="Дата создания товара"),
-    db: AsyncSession = Depends(get_async_db),
+    sort: str | None = Query(
+        None,
+        pattern="^(id|price|rating|created_at)$",
+        description="Сортировка: id, price, rating или created_at. "
+        "По умолчанию — релевантность при поиске, иначе id",
+    ),
+    cursor: str | None = Query(
+        None,
+        description="Курсор следующей страницы (next_cursor из предыдущего ответа). "
+        "Если передан, параметр page игнорируется",
+    ),
+    count_mode: str = Query(
+        "auto",
+        pattern="^(auto|exact|estimate)$",
+        description="Подсчёт total: exact — точно, estimate — оценка планировщика, "
+        "auto — точно для небольших выборок",
+    ),
+    facets: bool = Query(
+        False,
+        description="true — вернуть количество товаров по категориям, наличию "
+        "и ценовым диапазонам; total тогда всегда точный",
+    ),
+    search_mode: str = Query(
+        "full",
+        pattern="^(full|top)$",
+        description="full — искать по всем совпадениям; top — только среди первых "
+        "найденных совпадений в названии (для широких запросов). "
+        "В режиме top total не больше их числа, а total_capped=true означает, "
+        "что совпадений больше",
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Возвращает список всех активных товаров с поддержкой фильтров.
+    Поддерживает как постраничную (page), так и курсорную (cursor) пагинацию.
     """
     # Проверка логики min_price <= max_price
     if min_price is not None and max_price is not None and min_price > max_price:
@@ -57,66 +166,244 @@ async def get_all_products(
     # Формируем список фильтров
     filters = [ProductModel.is_active]
 
-    if category_id is not None:
+    if category_id is not None and include_descendants:
+        # Поддерево берём из снимка в памяти — без рекурсивного запроса
+        snapshot = await get_category_tree(db)
+        filters.append(ProductModel.category_id.in_(snapshot.descendants(category_id)))
+    elif category_id is not None:
         filters.append(ProductModel.category_id == category_id)
     if min_price is not None:
         filters.append(ProductModel.price >= min_price)
     if max_price is not None:
         filters.append(ProductModel.price <= max_price)
     if in_stock is not None:
+        # Во время флеш-распродажи заказы списывают сегменты, а products.stock
+        # хранит остаток на её начало: распроданный товар считается в наличии,
+        # пока распродажу не завершат
         filters.append(ProductModel.stock > 0 if in_stock else ProductModel.stock == 0)
     if seller_id is not None:
         filters.append(ProductModel.seller_id == seller_id)
     if created_at is not None:
         filters.append(ProductModel.created_at == created_at)
 
-    # Базовый запрос total
-    total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
-
-    rank_col = None
+    rank_expr = None
     if search:
         search_value = search.strip()
         if search_value:
             ts_query = func.websearch_to_tsquery("english", search_value)
             filters.append(ProductModel.tsv.op("@@")(ts_query))
-            rank_col = func.ts_rank_cd(ProductModel.tsv, ts_query).label("rank")
-            # total с учётом полнотекстового фильтра
-            total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
-
-    total = await db.scalar(total_stmt) or 0
-
-    # Основной запрос (если есть поиск — добавим ранг в выборку и сортировку)
-    if rank_col is not None:
-        products_stmt = (
-            select(ProductModel, rank_col)
-            .where(*filters)
-            .order_by(desc(rank_col), ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
+            rank_expr = func.ts_rank_cd(ProductModel.tsv, ts_query)
+
+    total_capped = False
+    top_mode = search_mode == "top" and rank_expr is not None
+    if top_mode:
+        # Кандидаты — первые SEARCH_TOP_CANDIDATES совпадений в названии (вес A)
+        # в порядке чтения GIN-индекса, без сортировки всей выдачи. Их id
+        # читаются один раз: total, фасеты и страница считаются по одному
+        # и тому же набору, а ранжирование и сортировка идут только внутри него
+        name_match = func.ts_filter(ProductModel.tsv, literal_column("'{a}'")).op("@@")(
+            ts_query
         )
-        result = await db.execute(products_stmt)
-        rows = result.all()
-        items = [row[0] for row in rows]  # сами объекты
-        # при желании можно вернуть ранг в ответе
-        # ranks = [row.rank for row in rows]
+        candidate_ids = (
+            await db.scalars(
+                select(ProductModel.id)
+                .where(*filters, name_match)
+                .limit(SEARCH_TOP_CANDIDATES + 1)
+            )
+        ).all()
+        total_capped = len(candidate_ids) > SEARCH_TOP_CANDIDATES
+        candidate_ids = candidate_ids[:SEARCH_TOP_CANDIDATES]
+        filters = [
+            ProductModel.id == any_(literal(candidate_ids, ARRAY(Integer))),
+            ProductModel.is_active,
+        ]
+
+    # total с учётом всех фильтров (включая полнотекстовый)
+    count_key = product_filter_key(
+        category_id=category_id,
+        include_descendants=include_descendants or None,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        seller_id=seller_id,
+        created_at=created_at,
+        search_mode=search_mode if top_mode else None,
+    )
+    facet_counts = None
+    if facets:
+        # Группировка по наличию делит все найденные товары на две части,
+        # так что точный total получается из фасетов без отдельного COUNT
+        facet_counts = await product_facets(db, filters, count_key)
+        total = facet_counts["in_stock"] + facet_counts["out_of_stock"]
+        total_exact = not total_capped
+    elif top_mode:
+        total, total_exact = len(candidate_ids), not total_capped
     else:
-        products_stmt = (
-            select(ProductModel)
-            .where(*filters)
-            .order_by(ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
+        total, total_exact = await count_products(db, filters, count_key, count_mode)
+
+    # Без явной сортировки при поиске сортируем по релевантности
+    if sort is None:
+        sort = "rank" if rank_expr is not None else "id"
+
+    page_filters = list(filters)
+    rows = None
+    if sort == "rank":
+        sort_col = rank_expr.label("rank")
+        order_by = [desc(sort_col), ProductModel.id]
+        last_id = None
+        if cursor is not None:
+            last_rank, last_id = decode_cursor(cursor, sort)
+            page_filters.append(
+                or_(
+                    rank_expr < last_rank,
+                    and_(rank_expr == last_rank, ProductModel.id > last_id),
+                )
+            )
+        products_stmt = select(ProductModel, sort_col)
+        # Порядок выдачи берём из кеша, если страница в него попадает
+        rows = await cached_search_page(
+            db,
+            filters,
+            rank_expr,
+            count_key,
+            page_size + 1,
+            offset=(page - 1) * page_size,
+            after_id=last_id,
         )
-        items = (await db.scalars(products_stmt)).all()
+    else:
+        sort_col, descending = SORT_COLUMNS[sort]
+        if sort == "id":
+            order_by = [ProductModel.id]
+        elif descending:
+            order_by = [desc(sort_col), desc(ProductModel.id)]
+        else:
+            order_by = [sort_col, ProductModel.id]
+        if cursor is not None:
+            last_value, last_id = decode_cursor(cursor, sort)
+            if sort == "id":
+                page_filters.append(ProductModel.id > last_id)
+            else:
+                # Сравнение кортежей (значение, id) даёт range scan по индексу
+                key = tuple_(sort_col, ProductModel.id)
+                bound = tuple_(literal(last_value, sort_col.type), literal(last_id))
+                page_filters.append(key < bound if descending else key > bound)
+        products_stmt = select(ProductModel, sort_col.label("sort_key"))
+
+    if rows is None:
+        products_stmt = products_stmt.where(*page_filters).order_by(*order_by)
+        if cursor is None:
+            products_stmt = products_stmt.offset((page - 1) * page_size)
+        # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+        rows = (await db.execute(products_stmt.limit(page_size + 1))).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_product, last_key = rows[-1]
+        next_cursor = encode_cursor(sort, last_key, last_product.id)
+    items = [row[0] for row in rows]
 
     return {
         "items": items,
         "total": total,
+        "total_exact": total_exact,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
+        "facets": facet_counts,
+        "total_capped": total_capped,
     }
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def _suggest_by_prefix(db: AsyncSession, query: str, limit: int) -> list:
+    # Побайтовое сравнение (COLLATE "C") совпадает с порядком индекса:
+    # префикс — это диапазон [query, query с увеличенным последним символом)
+    name_key = func.lower(ProductModel.name).collate("C")
+    upper_bound = query[:-1] + chr(ord(query[-1]) + 1)
+    return (
+        await db.execute(
+            select(ProductModel.id, ProductModel.name, ProductModel.price)
+            .where(
+                ProductModel.is_active,
+                name_key >= literal(query).collate("C"),
+                name_key < literal(upper_bound).collate("C"),
+            )
+            .order_by(name_key, ProductModel.id)
+            .limit(limit)
+        )
+    ).all()
+
+
+async def _suggest_by_similarity(db: AsyncSession, query: str, limit: int) -> list:
+    pattern = _escape_like(query)
+    name_prefix = ProductModel.name.ilike(f"{pattern}%", escape="\\")
+    matches = [
+        name_prefix,
+        ProductModel.name.ilike(f"% {pattern}%", escape="\\"),
+        # name %> q: слово из названия похоже на запрос (word_similarity)
+        ProductModel.name.op("%>")(query),
+    ]
+    return (
+        await db.execute(
+            select(ProductModel.id, ProductModel.name, ProductModel.price)
+            .where(ProductModel.is_active, or_(*matches))
+            .order_by(
+                desc(name_prefix),
+                desc(func.word_similarity(query, ProductModel.name)),
+                desc(ProductModel.rating),
+                ProductModel.id,
+            )
+            .limit(limit)
+        )
+    ).all()
+
+
+@router.get("/suggest", response_model=list[SuggestionSchema])
+async def suggest_products(
+    q: str = Query(
+        ..., min_length=1, max_length=100, description="Начало названия товара"
+    ),
+    limit: int = Query(10, ge=1, le=20, description="Сколько подсказок вернуть"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Подсказки по названию активных товаров для поиска по мере ввода.
+    Короткий запрос ищется только как начало названия: диапазон по индексу
+    ix_products_active_name_prefix читается в алфавитном порядке до limit
+    строк. С SUGGEST_FUZZY_MIN_LENGTH символов запрос ищется и как начало
+    одного из слов, и по сходству слов (с опечатками) через GIN-индекс
+    триграмм ix_products_active_name_trgm; сначала идут названия,
+    начинающиеся с запроса, затем наиболее похожие.
+    """
+    query = " ".join(q.lower().split())
+    if not query:
+        return []
+
+    cache_key = (query, limit)
+    cacheable = len(query) <= SUGGEST_CACHE_MAX_LENGTH
+    if cacheable:
+        body = suggest_cache.get(cache_key)
+        if body is not MISSING:
+            return Response(content=body, media_type="application/json")
+
+    if len(query) < SUGGEST_FUZZY_MIN_LENGTH:
+        rows = await _suggest_by_prefix(db, query, limit)
+    else:
+        rows = await _suggest_by_similarity(db, query, limit)
+
+    body = SuggestionListAdapter.dump_json(
+        SuggestionListAdapter.validate_python(rows, from_attributes=True)
+    )
+    if cacheable:
+        suggest_cache.set(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product: ProductCreate = Depends(ProductCreate.as_form),
@@ -152,20 +439,117 @@ async def create_product(
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    if image_url:
+        schedule_image_variants(image_url)
+    invalidate_product_counts()
+    catalog_cache.invalidate_tag(("category_listing", db_product.category_id))
     return db_product
 
 
+@router.post(
+    "/import", response_model=ImportJobSchema, status_code=status.HTTP_201_CREATED
+)
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Массово создаёт товары текущего продавца из потока CSV (text/csv, первая
+    строка — заголовок) или NDJSON (application/x-ndjson) с полями name,
+    description, price, stock, category_id. Тело читается потоково.
+    Ошибочные записи пропускаются и перечисляются в ответе; остальные товары
+    создаются в одной транзакции. Задача загрузки создаётся до чтения тела,
+    поэтому её ход виден в GET /products/import (среди загрузок продавца)
+    и затем в GET /products/import/{job_id}.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    import_format = IMPORT_FORMATS.get(content_type.lower())
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use text/csv or application/x-ndjson",
+        )
+
+    job = await create_import_job(current_user.id, import_format)
+    try:
+        category_ids = await run_product_import(db, job, request.stream())
+    except ImportFormatError as exc:
+        await db.rollback()
+        await fail_import_job(job, str(exc))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except Exception:
+        await db.rollback()
+        await fail_import_job(job, "Import aborted")
+        raise
+
+    invalidate_product_counts()
+    for category_id in category_ids:
+        catalog_cache.invalidate_tag(("category_listing", category_id))
+    return job
+
+
+@router.get("/import", response_model=list[ImportJobSchema])
+async def list_import_jobs(
+    limit: int = Query(20, ge=1, le=100, description="Сколько загрузок вернуть"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Возвращает последние массовые загрузки текущего продавца, начиная
+    с самой новой, в том числе ещё идущие.
+    """
+    result = await db.scalars(
+        select(ImportJobModel)
+        .where(ImportJobModel.seller_id == current_user.id)
+        .order_by(desc(ImportJobModel.id))
+        .limit(limit)
+    )
+    return result.all()
+
+
+@router.get("/import/{job_id}", response_model=ImportJobSchema)
+async def get_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Возвращает состояние массовой загрузки текущего продавца.
+    """
+    job = await db.scalar(
+        select(ImportJobModel).where(
+            ImportJobModel.id == job_id, ImportJobModel.seller_id == current_user.id
+        )
+    )
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found"
+        )
+    return job
+
+
 @router.get(
     "/category/{category_id}",
     response_model=list[ProductSchema],
     status_code=status.HTTP_200_OK,
 )
 async def get_products_by_category(
-    category_id: int, db: AsyncSession = Depends(get_async_db)
+    category_id: int,
+    include_descendants: bool = Query(
+        False, description="true — включить товары всех подкатегорий"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Возвращает список товаров в указанной категории по её ID.
     """
+    cache_key = ("category_products", category_id, include_descendants)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    version = catalog_cache.version
+
     result = await db.scalars(
         select(CategoryModel).where(
             CategoryModel.id == category_id, CategoryModel.is_active
@@ -180,23 +564,39 @@ async def get_products_by_category(
             detail="Category not found or inactive",
         )
 
+    category_ids = [category_id]
+    tags = [("category_listing", category_id)]
+    if include_descendants:
+        snapshot = await get_category_tree(db)
+        category_ids = list(snapshot.descendants(category_id))
+        tags = [("category_listing", cid) for cid in category_ids]
+        tags.append(("category_listing_tree",))
+
     result = await db.scalars(
         select(ProductModel).where(
-            ProductModel.category_id == category_id, ProductModel.is_active
+            ProductModel.category_id.in_(category_ids), ProductModel.is_active
         )
     )
 
     db_products = result.all()
-    return db_products
+    return cache_response(
+        cache_key, ProductListAdapter, db_products, version, tags=tags
+    )
 
 
 @router.get(
     "/{product_id}", response_model=ProductSchema, status_code=status.HTTP_200_OK
 )
-async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
     Возвращает детальную информацию о товаре по его ID.
     """
+    cache_key = ("product", product_id)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    version = catalog_cache.version
+
     result = await db.scalars(
         select(ProductModel).where(
             ProductModel.id == product_id, ProductModel.is_active
@@ -225,7 +625,14 @@ async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db))
             detail="Category not found or inactive",
         )
 
-    return db_product
+    # Карточка зависит от активности категории — помечаем тегом категории
+    return cache_response(
+        cache_key,
+        ProductAdapter,
+        db_product,
+        version,
+        tags=[("category", db_product.category_id)],
+    )
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
@@ -238,8 +645,12 @@ async def update_product(
 ):
     """
     Обновляет товар, если он принадлежит текущему продавцу (только для 'seller').
+    Во время флеш-распродажи остаток изменить нельзя: при её завершении
+    products.stock перезаписывается остатком сегментов.
     """
-    result = await db.scalars(select(ProductModel).where(ProductModel.id == product_id))
+    result = await db.scalars(
+        select(ProductModel).where(ProductModel.id == product_id).with_for_update()
+    )
     db_product = result.first()
     if not db_product:
         raise HTTPException(
@@ -250,6 +661,12 @@ async def update_product(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only update your own products",
         )
+    if db_product.stock_buckets and product.stock != db_product.stock:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock cannot be changed during a flash sale",
+        )
+    old_category_id = db_product.category_id
     category_result = await db.scalars(
         select(CategoryModel).where(
             CategoryModel.id == product.category_id, CategoryModel.is_active
@@ -267,12 +684,22 @@ async def update_product(
         .values(**product.model_dump())
     )
 
+    old_image_url = db_product.image_url
     if image:
-        remove_product_image(db_product.image_url)
+        # Сначала сохраняем новое изображение: если оно не пройдёт проверки,
+        # старое останется на месте
         db_product.image_url = await save_product_image(image)
+        db_product.image_variant_files = []
 
     await db.commit()
     await db.refresh(db_product)
+    if image:
+        # Старый файл удаляем только после коммита: при ошибке товар
+        # продолжает ссылаться на него
+        await remove_product_image(old_image_url)
+        schedule_image_variants(db_product.image_url)
+    invalidate_product_counts()
+    invalidate_product_cache(product_id, old_category_id, db_product.category_id)
     return db_product
 
 
@@ -306,41 +733,130 @@ async def delete_product(
         .where(ProductModel.id == product_id)
         .values(is_active=False)
     )
-    remove_product_image(product.image_url)
+    await db.commit()
+    await db.refresh(product)
+    await remove_product_image(product.image_url)
+    invalidate_product_counts()
+    invalidate_product_cache(product_id, product.category_id)
+    return product
 
+
+async def _get_own_product_for_update(
+    db: AsyncSession, product_id: int, current_user: UserModel
+) -> ProductModel:
+    result = await db.scalars(
+        select(ProductModel)
+        .where(ProductModel.id == product_id, ProductModel.is_active)
+        .with_for_update()
+    )
+    product = result.first()
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found or inactive",
+        )
+    if product.seller_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only manage your own products",
+        )
+    return product
+
+
+@router.post("/{product_id}/flash-sale", response_model=ProductSchema)
+async def start_flash_sale(
+    product_id: int,
+    payload: FlashSaleStart,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Переводит товар в режим флеш-распродажи (только для 'seller').
+    Остаток делится на сегменты, и заказы списывают его из разных строк.
+    Пока режим включён, products.stock при заказах не уменьшается.
+    """
+    product = await _get_own_product_for_update(db, product_id, current_user)
+    if product.stock_buckets:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Flash sale is already started for this product",
+        )
+    split_stock(db, product, payload.buckets)
     await db.commit()
     await db.refresh(product)
     return product
 
 
+@router.delete("/{product_id}/flash-sale", response_model=ProductSchema)
+async def finish_flash_sale(
+    product_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Завершает флеш-распродажу: оставшийся остаток сегментов возвращается в товар.
+    """
+    product = await _get_own_product_for_update(db, product_id, current_user)
+    if not product.stock_buckets:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Flash sale is not started for this product",
+        )
+    await merge_stock(db, product)
+    await db.commit()
+    await db.refresh(product)
+    invalidate_product_counts()
+    invalidate_product_cache(product_id, product.category_id)
+    return product
+
+
 async def save_product_image(file: UploadFile) -> str:
     """
     Сохраняет изображение товара и возвращает относительный URL.
+    Файл копируется потоково и не читается в память целиком.
+    Миниатюры ставит в очередь вызывающий код после коммита товара.
+
+    К вызову Starlette уже сохранила загрузку во временный файл; размер
+    тела до разбора формы ограничивает MultipartBodyLimitMiddleware,
+    а здесь проверяется размер самого файла.
     """
     if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, "Only JPG, PNG or WebP images are allowed"
         )
-
-    content = await file.read()
-    if len(content) > MAX_IMAGE_SIZE:
+    if file.size is not None and file.size > MAX_IMAGE_SIZE:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Image is too large")
 
     extension = Path(file.filename or "").suffix.lower() or ".jpg"
-    file_name = f"{uuid.uuid4()}{extension}"
-    file_path = MEDIA_ROOT / file_name
-    file_path.write_bytes(content)
-
+    await file.seek(0)
+    file_name = await run_in_threadpool(_write_image_file, file.file, extension)
     return f"/media/products/{file_name}"
 
 
-def remove_product_image(url: str | None) -> None:
+def _write_image_file(source: BinaryIO, extension: str) -> str:
+    """
+    Копирует загрузку блоками во временный файл рядом с целевым и атомарно
+    переименовывает его. Выполняется в пуле потоков, вне event loop.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=MEDIA_ROOT, suffix=".part")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            shutil.copyfileobj(source, target, IMAGE_CHUNK_SIZE)
+        file_name = f"{uuid.uuid4()}{extension}"
+        os.replace(tmp_path, MEDIA_ROOT / file_name)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return file_name
+
+
+async def remove_product_image(url: str | None) -> None:
     """
-    Удаляет файл изображения, если он существует.
+    Удаляет файл изображения и его производные, если они существуют.
     """
     if not url:
         return
     relative_path = url.lstrip("/")
     file_path = BASE_DIR / relative_path
-    if file_path.exists():
-        file_path.unlink()
+    await run_in_threadpool(remove_image_files, file_path)
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import func
 
 from app.auth import get_current_buyer, get_current_user
-from app.db_depends import get_async_db
+from app.db_depends import get_async_db, get_async_read_db
 from app.models.products import Product as ProductModel
 from app.models.reviews import Review as ReviewModel
 from app.models.users import User as UserModel
@@ -15,7 +14,7 @@ router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 
 @router.get("/", response_model=list[ReviewSchema], status_code=status.HTTP_200_OK)
-async def get_reviews(db: AsyncSession = Depends(get_async_db)):
+async def get_reviews(db: AsyncSession = Depends(get_async_read_db)):
     """
     Возвращает список всех активных отзывов
     """
@@ -31,7 +30,7 @@ async def get_reviews(db: AsyncSession = Depends(get_async_db)):
     status_code=status.HTTP_200_OK,
 )
 async def get_reviews_by_product(
-    product_id: int, db: AsyncSession = Depends(get_async_db)
+    product_id: int, db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Возвращает список активных отзывов для указанного товара
@@ -101,9 +100,10 @@ async def create_review(
 
     db_review = ReviewModel(**review.model_dump(), user_id=current_user.id)
     db.add(db_review)
+    # Агрегаты товара обновляются в той же транзакции, что и отзыв
+    await _apply_review_to_product(db, review.product_id, review.grade, 1)
     await db.commit()
     await db.refresh(db_review)
-    await update_product_rating(db, review.product_id)
     return db_review
 
 
@@ -126,10 +126,20 @@ async def delete_review(
         )
 
     if current_user.role == "admin" or current_user.id == db_review.user_id:
-        db_review.is_active = False
+        # Условная деактивация: при параллельных удалениях агрегаты
+        # уменьшит только тот запрос, который действительно снял отзыв
+        deactivated = await db.scalar(
+            update(ReviewModel)
+            .where(ReviewModel.id == review_id, ReviewModel.is_active)
+            .values(is_active=False)
+            .returning(ReviewModel.id)
+        )
+        if deactivated is not None:
+            await _apply_review_to_product(
+                db, db_review.product_id, db_review.grade, -1
+            )
         await db.commit()
         await db.refresh(db_review)
-        await update_product_rating(db, db_review.product_id)
         return db_review
 
     raise HTTPException(
@@ -138,13 +148,19 @@ async def delete_review(
     )
 
 
-async def update_product_rating(db: AsyncSession, product_id: int):
-    result = await db.execute(
-        select(func.avg(ReviewModel.grade)).where(
-            ReviewModel.product_id == product_id, ReviewModel.is_active
+async def _apply_review_to_product(
+    db: AsyncSession, product_id: int, grade: int, sign: int
+) -> None:
+    """
+    Добавляет (sign=1) или убирает (sign=-1) оценку из агрегатов товара
+    одним атомарным UPDATE; рейтинг пересчитывается базой из агрегатов.
+    """
+    await db.execute(
+        update(ProductModel)
+        .where(ProductModel.id == product_id)
+        .values(
+            review_count=ProductModel.review_count + sign,
+            grade_sum=ProductModel.grade_sum + sign * grade,
         )
+        .execution_options(synchronize_session=False)
     )
-    avg_rating = result.scalar() or 0.0
-    product = await db.get(ProductModel, product_id)
-    product.rating = avg_rating
-    await db.commit()
@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_seller
+from app.db_depends import get_async_read_db
+from app.models.seller_sales import SellerDailySales as SalesModel
+from app.models.users import User as UserModel
+from app.schemas import SellerAnalytics
+
+router = APIRouter(prefix="/sellers", tags=["sellers"])
+
+
+@router.get("/me/analytics", response_model=SellerAnalytics)
+async def get_my_analytics(
+    date_from: date | None = Query(
+        None, description="Первый день периода; по умолчанию — 30 дней назад"
+    ),
+    date_to: date | None = Query(
+        None, description="Последний день периода включительно; по умолчанию — сегодня"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
+    """
+    Возвращает продажи текущего продавца за период по дням и по товарам.
+    Читает только дневные агрегаты seller_daily_sales, не заказы.
+    """
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_to must not be earlier than date_from",
+        )
+
+    in_period = (
+        SalesModel.seller_id == current_user.id,
+        SalesModel.day.between(date_from, date_to),
+    )
+    units = func.sum(SalesModel.units).label("units")
+    revenue = func.sum(SalesModel.revenue).label("revenue")
+
+    by_day = await db.execute(
+        select(SalesModel.day, units, revenue)
+        .where(*in_period)
+        .group_by(SalesModel.day)
+        .order_by(SalesModel.day)
+    )
+    days = by_day.mappings().all()
+    by_product = await db.execute(
+        select(SalesModel.product_id, units, revenue)
+        .where(*in_period)
+        .group_by(SalesModel.product_id)
+        .order_by(revenue.desc(), SalesModel.product_id)
+    )
+
+    return SellerAnalytics(
+        date_from=date_from,
+        date_to=date_to,
+        units=sum(day["units"] for day in days),
+        revenue=sum((day["revenue"] for day in days), 0),
+        days=days,
+        products=by_product.mappings().all(),
+    )
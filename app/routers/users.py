@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth import (
     create_access_token,
     create_refresh_token,
+    get_active_user,
     hash_password,
     verify_password,
 )
@@ -34,7 +35,9 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)
 
     # Создание объекта пользователя с хешированным паролем
     db_user = UserModel(
-        email=user.email, hashed_password=hash_password(user.password), role=user.role
+        email=user.email,
+        hashed_password=await hash_password(user.password),
+        role=user.role,
     )
 
     # Добавление в сессию и сохранение в базе
@@ -57,7 +60,7 @@ async def login(
         )
     )
     user = result.first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -109,10 +112,7 @@ async def refresh_token(
         raise credentials_exception
 
     # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email, UserModel.is_active)
-    )
-    user = result.first()
+    user = await get_active_user(db, email)
     if user is None:
         raise credentials_exception
 
@@ -158,10 +158,7 @@ async def access_token(
         raise credentials_exception
 
     # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email, UserModel.is_active)
-    )
-    user = result.first()
+    user = await get_active_user(db, email)
     if user is None:
         raise credentials_exception
 
@@ -1,9 +1,18 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Annotated
 
 from fastapi import Form
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    computed_field,
+    field_validator,
+)
+
+from app.images import image_variant_urls
 
 
 class CategoryCreate(BaseModel):
@@ -39,6 +48,21 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева активных категорий с вложенными подкатегориями.
+    """
+
+    id: int = Field(..., description="Уникальный идентификатор категории")
+    name: str = Field(..., description="Название категории")
+    parent_id: int | None = Field(
+        None, description="ID родительской категории, если есть"
+    )
+    children: list["CategoryTreeNode"] = Field(
+        default_factory=list, description="Подкатегории"
+    )
+
+
 class ProductCreate(BaseModel):
     """
     Модель для создания и обновления товара.
@@ -93,12 +117,101 @@ class Product(BaseModel):
         ..., description="Цена товара в рублях", gt=0, decimal_places=2
     )
     image_url: str | None = Field(None, description="URL изображения товара")
+    image_variant_files: list[str] = Field(default_factory=list, exclude=True)
     stock: int = Field(..., description="Количество товара на складе")
     category_id: int = Field(..., description="ID категории")
     is_active: bool = Field(..., description="Активность товара")
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field(
+        description="URL миниатюр по размерам и форматам, например "
+        '{"thumb": {"webp": "..."}}; null, пока они не созданы в фоне после загрузки'
+    )
+    @property
+    def image_variants(self) -> dict[str, dict[str, str]] | None:
+        return image_variant_urls(self.image_url, self.image_variant_files)
+
+
+class ProductSuggestion(BaseModel):
+    """
+    Подсказка для поиска по мере ввода.
+    """
+
+    id: int = Field(..., description="ID товара")
+    name: str = Field(..., description="Название товара")
+    price: Decimal = Field(..., description="Цена товара в рублях")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FlashSaleStart(BaseModel):
+    """
+    Модель для перевода товара в режим флеш-распродажи.
+    """
+
+    buckets: int = Field(
+        8, ge=2, le=64, description="На сколько сегментов разделить остаток товара"
+    )
+
+
+class ProductImportError(BaseModel):
+    """
+    Ошибка в строке массовой загрузки товаров.
+    """
+
+    row: int | None = Field(
+        ..., description="Номер записи, начиная с 1; null — ошибка всего потока"
+    )
+    error: str = Field(..., description="Описание ошибки")
+
+
+class ProductImportJob(BaseModel):
+    """
+    Модель для ответа с состоянием массовой загрузки товаров.
+    """
+
+    id: int = Field(..., description="ID задачи загрузки")
+    format: str = Field(..., description="Формат: csv или ndjson")
+    status: str = Field(..., description="running, completed или failed")
+    rows_processed: int = Field(..., description="Сколько записей разобрано")
+    rows_imported: int = Field(..., description="Сколько товаров создано")
+    rows_failed: int = Field(..., description="Сколько записей отклонено")
+    errors: list[ProductImportError] = Field(
+        default_factory=list, description="Ошибки по строкам (первые из них)"
+    )
+    created_at: datetime = Field(..., description="Когда загрузка началась")
+    finished_at: datetime | None = Field(None, description="Когда загрузка завершилась")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryFacet(BaseModel):
+    category_id: int = Field(..., description="ID категории")
+    count: int = Field(..., ge=0, description="Количество товаров")
+
+
+class PriceRangeFacet(BaseModel):
+    min_price: Decimal | None = Field(
+        ..., description="Нижняя граница (включительно); null — без границы"
+    )
+    max_price: Decimal | None = Field(
+        ..., description="Верхняя граница (не включительно); null — без границы"
+    )
+    count: int = Field(..., ge=0, description="Количество товаров")
+
+
+class ProductFacets(BaseModel):
+    """
+    Количество товаров с текущими фильтрами в разрезе категорий,
+    наличия и ценовых диапазонов. Пустые категории и диапазоны не выводятся.
+    """
+
+    categories: list[CategoryFacet] = Field(description="По категориям")
+    in_stock: int = Field(ge=0, description="В наличии")
+    out_of_stock: int = Field(ge=0, description="Без остатка")
+    price_ranges: list[PriceRangeFacet] = Field(description="По ценовым диапазонам")
+
 
 class ProductList(BaseModel):
     """
@@ -107,8 +220,21 @@ class ProductList(BaseModel):
 
     items: list[Product] = Field(description="Товары для текущей страницы")
     total: int = Field(ge=0, description="Общее количество товаров")
+    total_exact: bool = Field(
+        True, description="true — total точный, false — оценка планировщика"
+    )
+    total_capped: bool = Field(
+        False,
+        description="true — в режиме поиска top совпадений больше, чем total",
+    )
     page: int = Field(ge=1, description="Номер текущей страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: str | None = Field(
+        None, description="Курсор следующей страницы, если она существует"
+    )
+    facets: ProductFacets | None = Field(
+        None, description="Фасеты по всем найденным товарам, если запрошены"
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -190,6 +316,24 @@ class CartItemUpdate(BaseModel):
     quantity: int = Field(..., ge=1, description="Новое количество товара")
 
 
+class CartSync(BaseModel):
+    """Модель для замены всего содержимого корзины."""
+
+    items: list[CartItemCreate] = Field(
+        default_factory=list,
+        max_length=500,
+        description="Желаемое содержимое корзины; товары, которых нет в списке, удаляются",
+    )
+
+    @field_validator("items")
+    @classmethod
+    def check_unique_products(cls, items: list[CartItemCreate]) -> list[CartItemCreate]:
+        product_ids = [item.product_id for item in items]
+        if len(product_ids) != len(set(product_ids)):
+            raise ValueError("Each product may appear in the cart only once")
+        return items
+
+
 class CartItem(BaseModel):
     """Товар в корзине с данными продукта."""
 
@@ -257,3 +401,65 @@ class OrderList(BaseModel):
     page_size: int = Field(ge=1, description="Размер страницы")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class OrderSummary(BaseModel):
+    """
+    Краткая информация о заказе для списка, без позиций
+    """
+
+    id: int = Field(..., description="ID заказа")
+    status: str = Field(..., description="Текущий статус заказа")
+    total_amount: Decimal = Field(..., ge=0, description="Общая стоимость")
+    created_at: datetime = Field(..., description="Когда заказ был создан")
+    items_count: int = Field(..., ge=0, description="Количество позиций в заказе")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderSummaryList(BaseModel):
+    """
+    Список пагинации для кратких сведений о заказах
+    """
+
+    items: list[OrderSummary] = Field(..., description="Заказы на текущей странице")
+    total: int = Field(ge=0, description="Общее количество заказов")
+    page: int = Field(ge=1, description="Текущая страница")
+    page_size: int = Field(ge=1, description="Размер страницы")
+
+
+class SalesByDay(BaseModel):
+    """
+    Продажи продавца за день
+    """
+
+    day: date = Field(..., description="День (UTC)")
+    units: int = Field(..., ge=0, description="Продано штук")
+    revenue: Decimal = Field(..., ge=0, description="Выручка")
+
+
+class SalesByProduct(BaseModel):
+    """
+    Продажи товара продавца за период
+    """
+
+    product_id: int = Field(..., description="ID товара")
+    units: int = Field(..., ge=0, description="Продано штук")
+    revenue: Decimal = Field(..., ge=0, description="Выручка")
+
+
+class SellerAnalytics(BaseModel):
+    """
+    Сводка продаж продавца за период
+    """
+
+    date_from: date = Field(..., description="Первый день периода")
+    date_to: date = Field(..., description="Последний день периода")
+    units: int = Field(..., ge=0, description="Продано штук за период")
+    revenue: Decimal = Field(..., ge=0, description="Выручка за период")
+    days: list[SalesByDay] = Field(
+        default_factory=list, description="Продажи по дням, в которые они были"
+    )
+    products: list[SalesByProduct] = Field(
+        default_factory=list, description="Продажи по товарам, по убыванию выручки"
+    )
@@ -0,0 +1,92 @@
+from collections.abc import Hashable
+
+from sqlalchemy import ARRAY, Integer, any_, desc, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import MISSING, TTLCache
+from app.config import SEARCH_CACHE_MAX_RESULTS, SEARCH_CACHE_MAXSIZE, SEARCH_CACHE_TTL
+from app.models.products import Product as ProductModel
+
+# Ранжированные результаты поиска по нормализованному ключу фильтров:
+# ключ -> (ids, ranks, complete); complete=False — выдача обрезана
+# до SEARCH_CACHE_MAX_RESULTS и дальше читается из базы
+search_result_cache = TTLCache(
+    "search_results", maxsize=SEARCH_CACHE_MAXSIZE, ttl=SEARCH_CACHE_TTL
+)
+
+
+async def _ranked_ids(
+    db: AsyncSession, filters: list, rank_expr, cache_key: Hashable
+) -> tuple[tuple[int, ...], tuple[float, ...], bool]:
+    cached = search_result_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    version = search_result_cache.version
+
+    rows = (
+        await db.execute(
+            select(ProductModel.id, rank_expr)
+            .where(*filters)
+            .order_by(desc(rank_expr), ProductModel.id)
+            .limit(SEARCH_CACHE_MAX_RESULTS + 1)
+        )
+    ).all()
+    complete = len(rows) <= SEARCH_CACHE_MAX_RESULTS
+    rows = rows[:SEARCH_CACHE_MAX_RESULTS]
+    result = (
+        tuple(row[0] for row in rows),
+        tuple(row[1] for row in rows),
+        complete,
+    )
+    search_result_cache.set(cache_key, result, version=version)
+    return result
+
+
+async def cached_search_page(
+    db: AsyncSession,
+    filters: list,
+    rank_expr,
+    cache_key: Hashable,
+    limit: int,
+    offset: int = 0,
+    after_id: int | None = None,
+) -> list[tuple[ProductModel, float]] | None:
+    """
+    Возвращает до limit строк (товар, ранг) выдачи, отсортированной
+    по релевантности, начиная с позиции offset или после товара after_id.
+    Порядок id берётся из кеша, товары страницы читаются одним запросом
+    WHERE id = ANY(...). Возвращает None, если страница выходит за пределы
+    закешированной части выдачи — тогда её нужно читать из базы.
+    """
+    ids, ranks, complete = await _ranked_ids(db, filters, rank_expr, cache_key)
+    if after_id is not None:
+        try:
+            offset = ids.index(after_id) + 1
+        except ValueError:
+            return None
+    if offset + limit > len(ids) and not complete:
+        return None
+
+    page_ids = ids[offset : offset + limit]
+    if not page_ids:
+        return []
+    products = await db.scalars(
+        select(ProductModel).where(
+            ProductModel.id == any_(literal(list(page_ids), ARRAY(Integer))),
+            ProductModel.is_active,
+        )
+    )
+    by_id = {product.id: product for product in products}
+    return [
+        (by_id[product_id], rank)
+        for product_id, rank in zip(page_ids, ranks[offset : offset + limit])
+        if product_id in by_id
+    ]
+
+
+def invalidate_search_results() -> None:
+    """
+    Сбрасывает закешированную выдачу после создания, изменения
+    или удаления товара.
+    """
+    search_result_cache.clear()
@@ -0,0 +1,89 @@
+import random
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+from sqlalchemy import Date, cast, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SELLER_ROLLUP_SHARDS
+from app.models.orders import Order as OrderModel
+from app.models.orders import OrderItem as OrderItemModel
+from app.models.products import Product as ProductModel
+from app.models.seller_sales import SellerDailySales as SalesModel
+
+
+async def record_sales(
+    db: AsyncSession, sales: list[tuple[int, int, int, Decimal]]
+) -> None:
+    """
+    Прибавляет продажи заказа к дневным агрегатам в текущей транзакции.
+    sales — строки (seller_id, product_id, units, revenue).
+    Все строки заказа пишутся в один случайный сегмент одним upsert.
+    """
+    if not sales:
+        return
+    # now() — время начала транзакции, то же, что попадёт в orders.created_at
+    day = cast(func.timezone("UTC", func.now()), Date)
+    shard = random.randrange(SELLER_ROLLUP_SHARDS)
+    # Одинаковый порядок ключей в параллельных заказах исключает взаимоблокировки
+    rows = [
+        {
+            "seller_id": seller_id,
+            "day": day,
+            "product_id": product_id,
+            "shard": shard,
+            "units": units,
+            "revenue": revenue,
+        }
+        for seller_id, product_id, units, revenue in sorted(sales)
+    ]
+    upsert = insert(SalesModel).values(rows)
+    await db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=["seller_id", "day", "product_id", "shard"],
+            set_={
+                "units": SalesModel.units + upsert.excluded.units,
+                "revenue": SalesModel.revenue + upsert.excluded.revenue,
+            },
+        )
+    )
+
+
+async def rebuild_rollups(db: AsyncSession, since: date | None = None) -> int:
+    """
+    Пересчитывает агрегаты из истории заказов (начиная с дня since, если он
+    передан) и возвращает число записанных строк. Таблица блокируется
+    до коммита: заказы, оформляемые во время пересчёта, ждут его окончания
+    и прибавляют свои продажи уже к новым строкам.
+    """
+    await db.execute(text("LOCK TABLE seller_daily_sales IN EXCLUSIVE MODE"))
+
+    order_day = cast(func.timezone("UTC", OrderModel.created_at), Date)
+    clear = delete(SalesModel)
+    history = (
+        select(
+            ProductModel.seller_id,
+            order_day,
+            OrderItemModel.product_id,
+            literal(0),
+            func.sum(OrderItemModel.quantity),
+            func.sum(OrderItemModel.total_price),
+        )
+        .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+        .join(ProductModel, ProductModel.id == OrderItemModel.product_id)
+        .group_by(ProductModel.seller_id, order_day, OrderItemModel.product_id)
+    )
+    if since is not None:
+        clear = clear.where(SalesModel.day >= since)
+        history = history.where(
+            OrderModel.created_at >= datetime.combine(since, time.min, timezone.utc)
+        )
+
+    await db.execute(clear)
+    result = await db.execute(
+        insert(SalesModel).from_select(
+            ["seller_id", "day", "product_id", "shard", "units", "revenue"], history
+        )
+    )
+    return result.rowcount
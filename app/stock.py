@@ -0,0 +1,169 @@
+import random
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product as ProductModel
+from app.models.stock_buckets import ProductStockBucket as BucketModel
+
+
+async def take_stock(db: AsyncSession, product: ProductModel, quantity: int) -> bool:
+    """
+    Атомарно списывает quantity единиц товара в текущей транзакции.
+    Возвращает False, если остатка недостаточно; ничего при этом не списывается.
+
+    Режим товара загружен без блокировки, и распродажу могут начать или
+    завершить до списания. Поэтому обычное списание срабатывает только
+    вне распродажи, а при неудаче режим перечитывается и списание
+    повторяется из другого источника.
+    """
+    if product.stock_buckets:
+        if await _take_from_buckets(db, product.id, quantity):
+            return True
+        if await _stock_buckets(db, product.id):
+            return False
+        return await _take_from_product(db, product.id, quantity)
+
+    if await _take_from_product(db, product.id, quantity):
+        return True
+    if await _stock_buckets(db, product.id):
+        return await _take_from_buckets(db, product.id, quantity)
+    return False
+
+
+async def _stock_buckets(db: AsyncSession, product_id: int) -> int:
+    return await db.scalar(
+        select(ProductModel.stock_buckets).where(ProductModel.id == product_id)
+    )
+
+
+async def _take_from_product(db: AsyncSession, product_id: int, quantity: int) -> bool:
+    # Условное списание: проверка и уменьшение остатка одним UPDATE. Если
+    # пока он ждал блокировку строки, началась распродажа, строка не подойдёт:
+    # весь остаток уже перенесён в сегменты
+    taken = await db.scalar(
+        update(ProductModel)
+        .where(
+            ProductModel.id == product_id,
+            ProductModel.stock_buckets == 0,
+            ProductModel.stock >= quantity,
+        )
+        .values(stock=ProductModel.stock - quantity)
+        .returning(ProductModel.id)
+    )
+    return taken is not None
+
+
+async def _try_take(db: AsyncSession, stmt) -> bool:
+    """
+    Выполняет условное списание внутри точки сохранения и откатывает её,
+    если списать не удалось. Postgres оставляет заблокированными строки,
+    которые после ожидания перестали подходить под условие; без отката
+    такие случайные блокировки в сочетании с упорядоченной блокировкой
+    в шаге 3 дают взаимоблокировки.
+    """
+    savepoint = await db.begin_nested()
+    taken = await db.scalar(stmt.execution_options(synchronize_session=False))
+    if taken is None:
+        await savepoint.rollback()
+        return False
+    await savepoint.commit()
+    return True
+
+
+async def _take_from_buckets(db: AsyncSession, product_id: int, quantity: int) -> bool:
+    # 1. Случайный сегмент с достаточным остатком, который никто не держит
+    #    (SKIP LOCKED): параллельные заказы расходятся по разным строкам
+    candidate = (
+        select(BucketModel.bucket)
+        .where(BucketModel.product_id == product_id, BucketModel.stock >= quantity)
+        .order_by(func.random())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    if await _try_take(
+        db,
+        update(BucketModel)
+        .where(BucketModel.product_id == product_id, BucketModel.bucket == candidate)
+        .values(stock=BucketModel.stock - quantity)
+        .returning(BucketModel.bucket),
+    ):
+        return True
+
+    # 2. Все подходящие сегменты заняты: ждём любой из них в случайном порядке
+    bucket_ids = list(
+        await db.scalars(
+            select(BucketModel.bucket).where(
+                BucketModel.product_id == product_id, BucketModel.stock >= quantity
+            )
+        )
+    )
+    random.shuffle(bucket_ids)
+    for bucket in bucket_ids:
+        if await _try_take(
+            db,
+            update(BucketModel)
+            .where(
+                BucketModel.product_id == product_id,
+                BucketModel.bucket == bucket,
+                BucketModel.stock >= quantity,
+            )
+            .values(stock=BucketModel.stock - quantity)
+            .returning(BucketModel.bucket),
+        ):
+            return True
+
+    # 3. Ни в одном сегменте не хватает целиком: собираем из нескольких,
+    #    блокируя все сегменты товара в фиксированном порядке. Шаги 1 и 2
+    #    к этому моменту не держат ни одной строки
+    buckets = (
+        await db.scalars(
+            select(BucketModel)
+            .where(BucketModel.product_id == product_id)
+            .order_by(BucketModel.bucket)
+            .with_for_update()
+        )
+    ).all()
+    if sum(bucket.stock for bucket in buckets) < quantity:
+        return False
+    remaining = quantity
+    for bucket in buckets:
+        portion = min(bucket.stock, remaining)
+        bucket.stock -= portion
+        remaining -= portion
+        if remaining == 0:
+            break
+    await db.flush()
+    return True
+
+
+def split_stock(db: AsyncSession, product: ProductModel, buckets: int) -> None:
+    """
+    Переводит товар в режим флеш-распродажи, распределяя остаток по сегментам.
+    """
+    base, extra = divmod(product.stock, buckets)
+    db.add_all(
+        BucketModel(
+            product_id=product.id,
+            bucket=index,
+            stock=base + (1 if index < extra else 0),
+        )
+        for index in range(buckets)
+    )
+    product.stock_buckets = buckets
+
+
+async def merge_stock(db: AsyncSession, product: ProductModel) -> None:
+    """
+    Возвращает товар в обычный режим: остаток сегментов переносится в products.stock.
+    """
+    # Заказы из сегментов не блокируют строку товара. DELETE дожидается
+    # незавершённых списаний и возвращает остатки уже после них
+    remaining = await db.scalars(
+        delete(BucketModel)
+        .where(BucketModel.product_id == product.id)
+        .returning(BucketModel.stock)
+    )
+    product.stock = sum(remaining)
+    product.stock_buckets = 0
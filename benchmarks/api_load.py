@@ -0,0 +1,465 @@
+"""
+Нагрузочный бенчмарк горячих путей API.
+
+Заполняет базу из DATABASE_URL синтетическим каталогом (--categories категорий,
+--products товаров), покупателями (--users) с корзинами и историей заказов
+(--orders-per-user), затем по очереди прогоняет сценарии, выполняя в каждом
+--requests запросов, не более --concurrency одновременно:
+
+- login           — POST /users/token;
+- product_detail  — GET /products/{id};
+- products_list   — GET /products/ с фильтрами по категории, цене и наличию;
+- products_search — GET /products/?search=...;
+- cart_add, cart_update, cart_remove — POST/PUT/DELETE /cart/items;
+- checkout        — POST /orders/checkout.
+
+Сценарии корзины и заказа меняют данные, поэтому в них не больше одного
+запроса на покупателя. В login запросы сверх PASSWORD_HASH_MAX_PENDING
+одновременных сразу получают 503 — это видно в statuses.
+
+Для каждого сценария выводится пропускная способность и задержки
+p50/p95/p99 в JSON, который можно сохранить (--output) и сравнить
+с прогоном на другом коммите. Данные и параметры запросов генерируются
+из --seed, поэтому прогоны с одинаковыми аргументами повторяемы.
+
+Запуск (на базе после `alembic upgrade head`):
+    python -m benchmarks.api_load --products 20000 --users 500 --requests 500
+    python -m benchmarks.api_load --scenarios products_search,product_detail
+
+По умолчанию приложение вызывается in-process. С --url запросы идут
+на запущенный сервер, например `uvicorn app.main:app --workers 4`; у сервера
+должны быть те же DATABASE_URL и SECRET_KEY.
+Созданные данные удаляются после прогона, если не указан --keep.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import delete, insert
+
+from app.auth import create_access_token, pwd_context
+from app.database import async_session_maker
+from app.main import app
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.categories import Category as CategoryModel
+from app.models.orders import Order as OrderModel
+from app.models.orders import OrderItem as OrderItemModel
+from app.models.products import Product as ProductModel
+from app.models.users import User as UserModel
+
+SCENARIOS = (
+    "login",
+    "product_detail",
+    "products_list",
+    "products_search",
+    "cart_add",
+    "cart_update",
+    "cart_remove",
+    "checkout",
+)
+# Сценарии, которые не меняют данные: перед ними идёт прогрев (--warmup)
+READ_ONLY_SCENARIOS = {"product_detail", "products_list", "products_search"}
+
+PASSWORD = "benchmark-password"
+ADJECTIVES = (
+    "compact", "wireless", "classic", "smart", "portable", "steel", "wooden",
+    "ergonomic", "premium", "organic", "vintage", "electric", "foldable", "silent",
+)  # fmt: skip
+NOUNS = (
+    "kettle", "lamp", "backpack", "headphones", "chair", "keyboard", "blender",
+    "jacket", "speaker", "camera", "watch", "mug", "tent", "bicycle", "monitor",
+    "sneakers", "drill", "umbrella", "pillow", "toaster",
+)  # fmt: skip
+INSERT_BATCH_SIZE = 5000
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _insert_returning_ids(db, model, rows: list[dict]) -> list[int]:
+    ids: list[int] = []
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        ids.extend(
+            await db.scalars(
+                insert(model).returning(model.id, sort_by_parameter_order=True),
+                rows[start : start + INSERT_BATCH_SIZE],
+            )
+        )
+    return ids
+
+
+async def seed(args: argparse.Namespace, run_id: str, rng: random.Random) -> dict:
+    """
+    Создаёт данные прогона и возвращает их ID: категории, товары в наличии,
+    покупателей и по одному свободному для корзины товару на покупателя.
+    """
+    hashed_password = pwd_context.hash(PASSWORD)
+    async with async_session_maker() as db:
+        (seller_id,) = await _insert_returning_ids(
+            db,
+            UserModel,
+            [
+                {
+                    "email": f"bench-seller-{run_id}@bench.local",
+                    "hashed_password": hashed_password,
+                    "role": "seller",
+                }
+            ],
+        )
+        (root_id,) = await _insert_returning_ids(
+            db, CategoryModel, [{"name": f"bench-{run_id}", "is_active": True}]
+        )
+        category_ids = await _insert_returning_ids(
+            db,
+            CategoryModel,
+            [
+                {
+                    "name": f"bench-{run_id}-{index}",
+                    "is_active": True,
+                    "parent_id": root_id,
+                }
+                for index in range(args.categories)
+            ],
+        )
+
+        # Каждый десятый товар без остатка — для фильтра in_stock
+        product_rows = [
+            {
+                "name": f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {index}",
+                "description": " ".join(rng.choices(ADJECTIVES + NOUNS, k=12)),
+                "price": Decimal(rng.randint(100, 500000)) / 100,
+                "stock": 0 if index % 10 == 0 else rng.randint(1000, 5000),
+                "category_id": rng.choice(category_ids),
+                "seller_id": seller_id,
+                "is_active": True,
+            }
+            for index in range(args.products)
+        ]
+        product_ids = await _insert_returning_ids(db, ProductModel, product_rows)
+        in_stock = [
+            (product_id, row["price"])
+            for product_id, row in zip(product_ids, product_rows)
+            if row["stock"]
+        ]
+
+        buyer_ids = await _insert_returning_ids(
+            db,
+            UserModel,
+            [
+                {
+                    "email": f"bench-buyer-{run_id}-{index}@bench.local",
+                    "hashed_password": hashed_password,
+                    "role": "buyer",
+                }
+                for index in range(args.users)
+            ],
+        )
+
+        # История заказов, корзины для checkout и свободный товар для cart_*
+        order_lines: list[list[tuple[int, Decimal, int]]] = []
+        order_rows, cart_rows, cart_products = [], [], []
+        for buyer_id in buyer_ids:
+            for _ in range(args.orders_per_user):
+                lines = [
+                    (*rng.choice(in_stock), rng.randint(1, 3))
+                    for _ in range(rng.randint(1, 3))
+                ]
+                order_lines.append(lines)
+                order_rows.append(
+                    {
+                        "user_id": buyer_id,
+                        "status": "pending",
+                        "total_amount": sum(price * qty for _, price, qty in lines),
+                    }
+                )
+            cart = rng.sample(in_stock, k=min(len(in_stock), 4))
+            cart_rows.extend(
+                {"user_id": buyer_id, "product_id": product_id, "quantity": 1}
+                for product_id, _ in cart[:3]
+            )
+            cart_products.append(cart[3][0])
+
+        order_ids = await _insert_returning_ids(db, OrderModel, order_rows)
+        item_rows = [
+            {
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity": qty,
+                "unit_price": price,
+                "total_price": price * qty,
+            }
+            for order_id, lines in zip(order_ids, order_lines)
+            for product_id, price, qty in lines
+        ]
+        for start in range(0, len(item_rows), INSERT_BATCH_SIZE):
+            await db.execute(
+                insert(OrderItemModel), item_rows[start : start + INSERT_BATCH_SIZE]
+            )
+        for start in range(0, len(cart_rows), INSERT_BATCH_SIZE):
+            await db.execute(
+                insert(CartItemModel), cart_rows[start : start + INSERT_BATCH_SIZE]
+            )
+        await db.commit()
+
+    return {
+        "seller_id": seller_id,
+        "category_ids": [root_id, *category_ids],
+        "product_ids": product_ids,
+        "buyers": [
+            (buyer_id, f"bench-buyer-{run_id}-{index}@bench.local")
+            for index, buyer_id in enumerate(buyer_ids)
+        ],
+        "cart_products": cart_products,
+        "orders": len(order_ids),
+    }
+
+
+async def cleanup(data: dict, run_id: str) -> None:
+    async with async_session_maker() as db:
+        # Заказы и корзины удаляются каскадом вместе с покупателями
+        await db.execute(
+            delete(UserModel).where(UserModel.email.like(f"bench-buyer-{run_id}-%"))
+        )
+        await db.execute(
+            delete(ProductModel).where(ProductModel.seller_id == data["seller_id"])
+        )
+        await db.execute(delete(UserModel).where(UserModel.id == data["seller_id"]))
+        root_id, *category_ids = data["category_ids"]
+        await db.execute(
+            delete(CategoryModel).where(CategoryModel.id.in_(category_ids))
+        )
+        await db.execute(delete(CategoryModel).where(CategoryModel.id == root_id))
+        await db.commit()
+
+
+def build_scenarios(
+    data: dict, args: argparse.Namespace, rng: random.Random
+) -> dict[str, tuple[int, Callable[[httpx.AsyncClient, int], Awaitable]]]:
+    """
+    Возвращает для каждого сценария число запросов и функцию, выполняющую
+    i-й запрос. Параметры запросов заранее выбираются из rng.
+    """
+    buyers = data["buyers"]
+    headers = [
+        {
+            "Authorization": "Bearer "
+            + create_access_token({"sub": email, "role": "buyer", "id": buyer_id})
+        }
+        for buyer_id, email in buyers
+    ]
+    product_ids = data["product_ids"]
+    category_ids = data["category_ids"][1:]
+    requests = args.requests
+    per_buyer = min(requests, len(buyers))
+
+    detail_ids = [rng.choice(product_ids) for _ in range(requests)]
+    list_params = []
+    for _ in range(requests):
+        low = rng.randint(1, 4000)
+        list_params.append(
+            {
+                "category_id": rng.choice(category_ids),
+                "min_price": low,
+                "max_price": low + rng.randint(50, 1000),
+                "in_stock": "true",
+                "sort": rng.choice(("price", "rating", "created_at")),
+            }
+        )
+    search_terms = [
+        " ".join(rng.sample(NOUNS + ADJECTIVES, k=rng.randint(1, 2)))
+        for _ in range(requests)
+    ]
+
+    async def login(client, i):
+        return await client.post(
+            "/users/token",
+            data={"username": buyers[i % len(buyers)][1], "password": PASSWORD},
+        )
+
+    async def product_detail(client, i):
+        return await client.get(f"/products/{detail_ids[i]}")
+
+    async def products_list(client, i):
+        return await client.get("/products/", params=list_params[i])
+
+    async def products_search(client, i):
+        return await client.get("/products/", params={"search": search_terms[i]})
+
+    async def cart_add(client, i):
+        return await client.post(
+            "/cart/items",
+            json={"product_id": data["cart_products"][i], "quantity": 1},
+            headers=headers[i],
+        )
+
+    async def cart_update(client, i):
+        return await client.put(
+            f"/cart/items/{data['cart_products'][i]}",
+            json={"quantity": 2},
+            headers=headers[i],
+        )
+
+    async def cart_remove(client, i):
+        return await client.delete(
+            f"/cart/items/{data['cart_products'][i]}", headers=headers[i]
+        )
+
+    async def checkout(client, i):
+        return await client.post("/orders/checkout", headers=headers[i])
+
+    return {
+        "login": (requests, login),
+        "product_detail": (requests, product_detail),
+        "products_list": (requests, products_list),
+        "products_search": (requests, products_search),
+        "cart_add": (per_buyer, cart_add),
+        "cart_update": (per_buyer, cart_update),
+        "cart_remove": (per_buyer, cart_remove),
+        "checkout": (per_buyer, checkout),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    call: Callable[[httpx.AsyncClient, int], Awaitable],
+    count: int,
+    concurrency: int,
+) -> dict:
+    latencies: list[float] = []  # мс
+    statuses: dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call(client, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": count,
+        "errors": sum(n for code, n in statuses.items() if code >= 400),
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(count / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--orders-per-user", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help="Сценарии через запятую, выполняются в порядке списка SCENARIOS",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Адрес запущенного сервера вместо in-process")
+    parser.add_argument("--output", help="Файл для сохранения отчёта JSON")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    selected = {name.strip() for name in args.scenarios.split(",") if name.strip()}
+    unknown = selected - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    data = await seed(args, run_id, rng)
+    seed_seconds = time.perf_counter() - started
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "in-process",
+        "args": vars(args),
+        "seed_seconds": round(seed_seconds, 3),
+        "seeded": {
+            "products": len(data["product_ids"]),
+            "users": len(data["buyers"]),
+            "orders": data["orders"],
+        },
+        "scenarios": {},
+    }
+
+    if args.url:
+        client_options = {"base_url": args.url}
+    else:
+        client_options = {
+            "transport": httpx.ASGITransport(app=app),
+            "base_url": "http://bench",
+        }
+    try:
+        async with httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=args.concurrency),
+            **client_options,
+        ) as client:
+            scenarios = build_scenarios(data, args, rng)
+            for name in SCENARIOS:
+                if name not in selected:
+                    continue
+                count, call = scenarios[name]
+                if name in READ_ONLY_SCENARIOS and args.warmup:
+                    await run_scenario(
+                        client, call, min(args.warmup, count), args.concurrency
+                    )
+                report["scenarios"][name] = await run_scenario(
+                    client, call, count, args.concurrency
+                )
+    finally:
+        if not args.keep:
+            await cleanup(data, run_id)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Нагрузочный тест флеш-распродажи: толпа покупателей оформляет заказ
+на один и тот же товар.
+
+Создаёт в базе из DATABASE_URL продавца, категорию, товар с остатком --stock
+и --buyers покупателей, у каждого в корзине --quantity единиц товара.
+Затем одновременно (не более --concurrency запросов сразу) вызывает
+POST /orders/checkout через приложение in-process и проверяет, что:
+- продано не больше исходного остатка;
+- остаток в базе равен исходному минус проданное и не ушёл в минус.
+
+Запуск (на базе после `alembic upgrade head`):
+    python -m benchmarks.flash_sale --stock 500 --buyers 2000 --buckets 16
+    python -m benchmarks.flash_sale --stock 500 --buyers 2000 --buckets 0
+
+--buckets 0 — обычный режим: один условный UPDATE по строке товара.
+Созданные данные удаляются после прогона, если не указан --keep.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import delete, func, select
+
+from app.auth import create_access_token
+from app.database import async_session_maker
+from app.main import app
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.categories import Category as CategoryModel
+from app.models.orders import Order as OrderModel
+from app.models.orders import OrderItem as OrderItemModel
+from app.models.products import Product as ProductModel
+from app.models.stock_buckets import ProductStockBucket as BucketModel
+from app.models.users import User as UserModel
+from app.stock import split_stock
+
+
+async def seed(args: argparse.Namespace, run_id: str) -> tuple[int, list[UserModel]]:
+    async with async_session_maker() as db:
+        seller = UserModel(
+            email=f"flash-seller-{run_id}@bench.local",
+            hashed_password="-",
+            role="seller",
+        )
+        category = CategoryModel(name=f"flash-{run_id}")
+        db.add_all([seller, category])
+        await db.flush()
+
+        product = ProductModel(
+            name=f"Flash SKU {run_id}",
+            price=Decimal("9.99"),
+            stock=args.stock,
+            category_id=category.id,
+            seller_id=seller.id,
+        )
+        db.add(product)
+        await db.flush()
+        if args.buckets:
+            split_stock(db, product, args.buckets)
+
+        buyers = [
+            UserModel(
+                email=f"flash-buyer-{run_id}-{index}@bench.local",
+                hashed_password="-",
+                role="buyer",
+            )
+            for index in range(args.buyers)
+        ]
+        db.add_all(buyers)
+        await db.flush()
+        db.add_all(
+            CartItemModel(
+                user_id=buyer.id, product_id=product.id, quantity=args.quantity
+            )
+            for buyer in buyers
+        )
+        await db.commit()
+        return product.id, buyers
+
+
+async def remaining_stock(product_id: int) -> tuple[int, int]:
+    """
+    Возвращает (остаток, минимальный остаток среди строк) товара.
+    """
+    async with async_session_maker() as db:
+        product = await db.get(ProductModel, product_id)
+        if not product.stock_buckets:
+            return product.stock, product.stock
+        total, lowest = (
+            await db.execute(
+                select(func.sum(BucketModel.stock), func.min(BucketModel.stock)).where(
+                    BucketModel.product_id == product_id
+                )
+            )
+        ).one()
+        return total, lowest
+
+
+async def cleanup(product_id: int, run_id: str) -> None:
+    async with async_session_maker() as db:
+        order_ids = select(OrderItemModel.order_id).where(
+            OrderItemModel.product_id == product_id
+        )
+        await db.execute(delete(OrderModel).where(OrderModel.id.in_(order_ids)))
+        product = await db.get(ProductModel, product_id)
+        category_id = product.category_id
+        await db.delete(product)
+        await db.execute(
+            delete(UserModel).where(UserModel.email.like(f"flash-%-{run_id}%"))
+        )
+        await db.execute(delete(CategoryModel).where(CategoryModel.id == category_id))
+        await db.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--buckets", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    product_id, buyers = await seed(args, run_id)
+    tokens = [
+        create_access_token({"sub": buyer.email, "role": buyer.role, "id": buyer.id})
+        for buyer in buyers
+    ]
+
+    statuses: dict[int, int] = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=60
+    ) as client:
+
+        async def checkout(token: str) -> None:
+            async with semaphore:
+                response = await client.post(
+                    "/orders/checkout", headers={"Authorization": f"Bearer {token}"}
+                )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(checkout(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+
+    sold = statuses.get(201, 0) * args.quantity
+    stock_left, lowest_row = await remaining_stock(product_id)
+    report = {
+        "mode": f"buckets={args.buckets}" if args.buckets else "single-row",
+        "stock": args.stock,
+        "buyers": args.buyers,
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "units_sold": sold,
+        "stock_left": stock_left,
+        "oversold": sold > args.stock or stock_left != args.stock - sold,
+        "negative_stock": lowest_row < 0,
+        "seconds": round(elapsed, 3),
+        # Все попытки, включая быстрые отказы после распродажи остатка
+        "attempts_per_second": round(args.buyers / elapsed, 1),
+        "successful_checkouts_per_second": round(statuses.get(201, 0) / elapsed, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+    if not args.keep:
+        await cleanup(product_id, run_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())